@@ -1,4 +1,12 @@
-from django.db import models
+import json
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 from simple_history.admin import SimpleHistoryAdmin
 from unfold.admin import (
     ModelAdmin,
@@ -10,6 +18,202 @@ from unfold.widgets import (
     UnfoldAdminTextInputWidget,
     UnfoldAdminFileFieldWidget,
 )
+from unfold.contrib.filters.admin import AutocompleteSelectFilter
+from unfold.views import ChangeList
+
+CURSOR_VAR = "cursor"
+
+
+# --- PAGINATION ---
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads row counts from the planner statistics on PostgreSQL.
+
+    Estimates below ``exact_count_threshold`` are replaced by a real COUNT(*),
+    so small or heavily filtered lists still show exact numbers.
+    """
+
+    exact_count_threshold = 10000
+    is_estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = self.get_estimated_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        self.is_estimated = True
+        return estimate
+
+    def get_estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            else:
+                compiler = queryset.order_by().query.get_compiler(queryset.db)
+                sql, params = compiler.as_sql()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                row = (plan[0]["Plan"]["Plan Rows"],)
+
+        # reltuples is -1 for tables that have never been analyzed
+        if not row or row[0] is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist that seeks by a (created_at, pk) cursor instead of OFFSET.
+
+    Only the default newest-first ordering is paginated this way; sorting by
+    a column falls back to regular page numbers. NULLs cannot be sought
+    past, so models whose created_at is nullable are keyed on pk alone.
+    Only the first page is counted.
+    """
+
+    keyset_field = "created_at"
+
+    def __init__(self, request, *args, **kwargs):
+        self.keyset_active = ORDER_VAR not in request.GET
+        self.cursor = request.GET.get(CURSOR_VAR) if self.keyset_active else None
+        self.next_cursor = None
+        super().__init__(request, *args, **kwargs)
+
+    @cached_property
+    def keyset_fields(self):
+        try:
+            field = self.model._meta.get_field(self.keyset_field)
+        except FieldDoesNotExist:
+            return ("pk",)
+        return ("pk",) if field.null else (self.keyset_field, "pk")
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, search and sort links always start again from the first page
+        remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_ordering(self, request, queryset):
+        if self.keyset_active:
+            return [f"-{field}" for field in self.keyset_fields]
+        return super().get_ordering(request, queryset)
+
+    def decode_cursor(self, cursor):
+        *values, pk = cursor.split("|")
+        values = [parse_datetime(value) for value in values]
+        if (
+            len(values) != len(self.keyset_fields) - 1
+            or None in values
+            or not pk.isdigit()
+        ):
+            raise IncorrectLookupParameters
+        return (*values, int(pk))
+
+    def encode_cursor(self, key):
+        *values, pk = key
+        return "|".join([*(value.isoformat() for value in values), str(pk)])
+
+    def get_results(self, request):
+        if not self.keyset_active:
+            return super().get_results(request)
+
+        queryset = self.queryset
+        if self.cursor:
+            *values, pk = self.decode_cursor(self.cursor)
+            if values:
+                field, value = self.keyset_fields[0], values[0]
+                # The <= bound lets the index seek; the OR only breaks ties
+                queryset = queryset.filter(**{f"{field}__lte": value}).filter(
+                    models.Q(**{f"{field}__lt": value}) | models.Q(pk__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(pk__lt=pk)
+
+        paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        keys = list(
+            queryset.values_list(*self.keyset_fields)[
+                self.list_per_page - 1 : self.list_per_page + 1
+            ]
+        )
+        if len(keys) > 1:
+            self.next_cursor = self.encode_cursor(keys[0])
+        result_list = queryset[: self.list_per_page]
+
+        if self.cursor:
+            # Later pages are not counted; only the rows shown are known
+            self.result_count = self.full_result_count = len(result_list)
+            self.show_full_result_count = False
+            self.show_admin_actions = True
+        else:
+            if self.model_admin.show_full_result_count:
+                root_queryset = self.root_queryset.order_by("pk")
+                full_result_count = paginator.__class__(root_queryset, 1).count
+            else:
+                full_result_count = None
+            self.result_count = paginator.count
+            self.show_full_result_count = self.model_admin.show_full_result_count
+            self.show_admin_actions = not self.show_full_result_count or bool(
+                full_result_count
+            )
+            self.full_result_count = full_result_count
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.next_cursor)
+        self.paginator = paginator
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+    @property
+    def next_page_url(self):
+        if not self.next_cursor:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+# --- FILTERS ---
+def is_autocomplete_request(request):
+    match = request.resolver_match
+    return match is not None and match.url_name == "autocomplete"
+
+
+class AutocompleteFilter(AutocompleteSelectFilter):
+    """
+    Related-object filter that looks candidates up through the admin
+    autocomplete view instead of rendering every object into the sidebar.
+
+    The related model's admin must define ``search_fields``; prefer indexed
+    lookups such as ``code__startswith`` over the default ``icontains``.
+    Admins using it need ``list_filter_submit = True``.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        related_model = field.remote_field.model
+        related_admin = model_admin.admin_site._registry.get(related_model)
+        if related_admin is None or not related_admin.search_fields:
+            raise ImproperlyConfigured(
+                f"The autocomplete filter on '{field_path}' requires a registered "
+                f"admin with search_fields for {related_model.__name__}."
+            )
 
 
 class BaseInlineAdmin:
@@ -48,6 +252,8 @@ class TabularInline(BaseInlineAdmin, BaseTabularInline):
 
 
 class BaseModelAdmin(ModelAdmin, SimpleHistoryAdmin):
+    # Opt in for large tables: cursor pagination and estimated counts
+    keyset_pagination = False
     readonly_fields = ["created_at", "updated_at", "created_by", "updated_by"]
     exclude = ["created_by", "updated_by"]
     formfield_overrides = {
@@ -57,12 +263,39 @@ class BaseModelAdmin(ModelAdmin, SimpleHistoryAdmin):
         models.FileField: {"widget": UnfoldAdminFileFieldWidget},
     }
 
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        if self.keyset_pagination and not self.change_list_template:
+            self.change_list_template = "admin/keyset_change_list.html"
+
     def save_model(self, request, obj, form, change):
         if not change:
             obj.created_by = request.user
         obj.updated_by = request.user
         super().save_model(request, obj, form, change)
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not is_autocomplete_request(request):
+            return queryset
+        # Autocomplete options are rendered with __str__, which usually
+        # follows the same relations as the changelist
+        if isinstance(self.list_select_related, (list, tuple)):
+            queryset = queryset.select_related(*self.list_select_related)
+        if not queryset.ordered:
+            queryset = queryset.order_by("-pk")
+        return queryset
+
+    def get_changelist(self, request, **kwargs):
+        if self.keyset_pagination:
+            return KeysetChangeList
+        return super().get_changelist(request, **kwargs)
+
+    def get_paginator(self, request, queryset, per_page, *args, **kwargs):
+        if self.keyset_pagination or is_autocomplete_request(request):
+            return EstimatedCountPaginator(queryset, per_page, *args, **kwargs)
+        return super().get_paginator(request, queryset, per_page, *args, **kwargs)
+
     def get_fieldsets(self, request, obj=None):
         fieldsets = super().get_fieldsets(request, obj)
         if fieldsets == [(None, {"fields": list(self.get_fields(request, obj))})]:
@@ -1,26 +1,43 @@
 import os
+from common.services.files import journal_field_files, journal_files
 from common.services.image import ImageOptimizer
-from django.db.models.signals import pre_save, pre_delete
-from django.db.models.fields.files import FileField, ImageField
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_save,
+    pre_delete,
+)
+from django.core.files.base import ContentFile
+from django.db.models.fields.files import FileField, ImageField, ImageFieldFile
 
 
 class AutoCleanupFieldMixin:
     """
     A mixin that automatically deletes files when either
     the file is replaced or the model is deleted.
+
+    The file name loaded from the database is remembered on the instance, so
+    replacements are detected without querying. Orphaned files are recorded
+    in the cleanup journal in the same transaction as the model write, and
+    deleted later by the `cleanup_files` command. The files of everything a
+    delete removes, cascades included, are journaled with one insert.
     """
 
-    def delete_file(self, instance, **kwargs):
+    def get_stored_names(self, file):
+        """
+        Returns the storage names of everything stored for a file.
+        """
+        return [file.name]
+
+    def delete_file(self, instance, file=None, using=None, **kwargs):
         """
         Deletes the file from storage when the corresponding field is cleared or model instance is deleted.
         """
-        file = getattr(instance, self.name)
-        if file and hasattr(file, "path") and os.path.isfile(file.path):
-            try:
-                os.remove(file.path)
-            except (FileNotFoundError, PermissionError) as e:
-                # Log the error if needed
-                print(f"Error deleting file {file.path}: {e}")
+        file = file or getattr(instance, self.name)
+        if file:
+            # Variants are resolved from the name when the file is deleted
+            journal_files(self, [file.name], using=using)
 
     def contribute_to_class(self, cls, name, **kwargs):
         """
@@ -28,35 +45,80 @@ class AutoCleanupFieldMixin:
         """
         super().contribute_to_class(cls, name, **kwargs)
 
+        # Remember the loaded file name, and the saved one after each save
+        post_init.connect(self.track_file_name, sender=cls)
+        post_save.connect(self.track_file_name, sender=cls)
+
         # Connect pre_save signal to handle file replacement
         pre_save.connect(self.handle_file_replacement, sender=cls)
 
-        # Connect pre_delete signal to handle instance deletion
+        # Collect the files of deleted instances, and journal them once deleted
         pre_delete.connect(self.handle_instance_deletion, sender=cls)
+        post_delete.connect(self.flush_deleted_files, sender=cls)
+
+    def get_file_name(self, instance):
+        """
+        Returns the current file name without loading deferred fields.
+        """
+        value = instance.__dict__[self.attname]
+        return getattr(value, "name", value) or None
 
-    def handle_file_replacement(self, instance, **kwargs):
+    def track_file_name(self, instance, **kwargs):
+        """
+        Remembers the file name the instance holds in the database.
+        """
+        tracked = instance.__dict__.setdefault("_tracked_file_names", {})
+        if self.attname in instance.__dict__:
+            tracked[self.attname] = self.get_file_name(instance)
+
+    def handle_file_replacement(self, instance, using=None, **kwargs):
         """
         Deletes the old file when a new file is uploaded.
         """
-        if not instance.pk:
+        # A field that is still deferred cannot have been replaced
+        if not instance.pk or self.attname not in instance.__dict__:
             return
 
-        try:
-            old_instance = instance.__class__.objects.get(pk=instance.pk)
-            old_file = getattr(old_instance, self.name)
-            new_file = getattr(instance, self.name)
-
-            if old_file and old_file != new_file:
-                self.delete_file(old_instance)
+        tracked = instance.__dict__.get("_tracked_file_names", {})
+        if self.attname in tracked:
+            old_name = tracked[self.attname]
+        else:
+            # The field was deferred when loaded and assigned afterwards
+            old_name = (
+                instance.__class__._base_manager.using(using)
+                .filter(pk=instance.pk)
+                .values_list(self.attname, flat=True)
+                .first()
+            )
 
-        except instance.__class__.DoesNotExist:
-            pass
+        if old_name and old_name != self.get_file_name(instance):
+            old_file = self.attr_class(instance, self, old_name)
+            self.delete_file(instance, file=old_file, using=using)
 
-    def handle_instance_deletion(self, instance, **kwargs):
+    def handle_instance_deletion(self, instance, using=None, origin=None, **kwargs):
         """
         Deletes the file when the model instance is deleted.
+
+        The file is held on the origin of the delete until its first
+        post_delete, so all files of one delete are journaled together.
         """
-        self.delete_file(instance)
+        if origin is None:
+            self.delete_file(instance, using=using)
+            return
+        file = getattr(instance, self.name)
+        if file:
+            pending = origin.__dict__.setdefault("_pending_deleted_files", [])
+            pending.append((self, file.name))
+
+    def flush_deleted_files(self, origin=None, using=None, **kwargs):
+        """
+        Journals the files collected for a delete, inside its transaction.
+        """
+        pending = (
+            origin.__dict__.pop("_pending_deleted_files", None) if origin else None
+        )
+        if pending:
+            journal_field_files(pending, using=using)
 
 
 class AutoCleanupFileField(AutoCleanupFieldMixin, FileField):
@@ -77,21 +139,145 @@ class AutoCleanupImageField(AutoCleanupFieldMixin, ImageField):
     pass
 
 
+class OptimizedImageFieldFile(ImageFieldFile):
+    """
+    Image file with named variants (e.g. a thumbnail), generated from the
+    original when it is saved and stored next to it.
+    """
+
+    def is_vector(self):
+        return self.name.lower().endswith(".svg")
+
+    def variant_name(self, variant):
+        """Storage name of a variant: `<name>.<variant>.<format>`"""
+        options = self.field.variants[variant]
+        root = os.path.splitext(self.name)[0]
+        return f"{root}.{variant}.{ImageOptimizer.get_format(options.get('format'))}"
+
+    def get_variant(self, variant):
+        """Returns the storage name of a variant, without touching storage"""
+        if self.is_vector():
+            return self.name  # Vector images scale as they are
+        return self.variant_name(variant)
+
+    def variant_url(self, variant):
+        return self.storage.url(self.get_variant(variant))
+
+    def create_variants(self, missing_only=False):
+        """
+        Generates and stores every variant of the original.
+
+        With `missing_only` variants that already exist are left as they are.
+        Returns the number of variants written.
+        """
+        if self.is_vector():
+            return 0
+
+        created = 0
+        for variant, options in self.field.variants.items():
+            name = self.variant_name(variant)
+            if missing_only and self.storage.exists(name):
+                continue
+            self.open("rb")
+            try:
+                content = ImageOptimizer.optimize_image(
+                    self,
+                    format=options.get("format"),
+                    quality=options.get("quality"),
+                    max_dimensions=options.get("max_dimensions"),
+                    preset=options.get("preset"),
+                    name=os.path.splitext(name)[0],
+                    resize=True,
+                )
+            finally:
+                self.close()
+            if not ImageOptimizer.is_optimized(content):
+                # Nothing to scale down, serve a copy of the original
+                self.open("rb")
+                try:
+                    content = ContentFile(self.read())
+                finally:
+                    self.close()
+            if self.storage.exists(name):
+                self.storage.delete(name)
+            self.storage.save(name, content)
+            created += 1
+        return created
+
+    def save(self, name, content, save=True):
+        super().save(name, content, save=save)
+        self.create_variants()
+
+    def delete(self, save=True):
+        """
+        Clears the file and journals it, with its variants, for deletion by
+        `cleanup_files` instead of deleting it from storage right away.
+        """
+        if not self:
+            return
+        journal_files(self.field, [self.name], using=self.instance._state.db)
+        if hasattr(self, "_file"):
+            self.close()
+            del self.file
+        self.name = None
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = False
+        if save:
+            self.instance.save()
+
+
 class OptimizedImageField(AutoCleanupImageField):
-    def __init__(self, *args, format=None, quality=None, max_dimensions=None, **kwargs):
+    attr_class = OptimizedImageFieldFile
+
+    def __init__(
+        self,
+        *args,
+        format=None,
+        quality=None,
+        max_dimensions=None,
+        preset=None,
+        variants=None,
+        **kwargs,
+    ):
         self.image_format = format
         self.image_quality = quality
         self.max_dimensions = max_dimensions
+        self.image_preset = preset
+        # Maps variant names to optimize options, e.g.
+        # {"thumbnail": {"max_dimensions": (200, 200)}}
+        self.variants = variants or {}
         super().__init__(*args, **kwargs)
 
+    def get_stored_names(self, file):
+        if file.is_vector():
+            return [file.name]
+        return [file.name] + [file.variant_name(variant) for variant in self.variants]
+
+    def optimize(self, image, name=None):
+        """
+        Encodes a file or an in-memory PIL image once with the field's
+        settings. The result is stored as is by `pre_save`.
+        """
+        return ImageOptimizer.optimize_image(
+            image,
+            format=self.image_format,
+            quality=self.image_quality,
+            max_dimensions=self.max_dimensions,
+            preset=self.image_preset,
+            name=name,
+        )
+
     def pre_save(self, model_instance, add):
         file = getattr(model_instance, self.attname)
-        if file and not file._committed:
-            optimized = ImageOptimizer.optimize_image(
-                file,
-                format=self.image_format,
-                quality=self.image_quality,
-                max_dimensions=self.max_dimensions,
-            )
-            setattr(model_instance, self.attname, optimized)
+        # Vector images are stored as they are
+        is_svg = self.image_format == "svg" or (
+            file and file.name.lower().endswith(".svg")
+        )
+        if (
+            file
+            and not file._committed
+            and not is_svg
+            and not ImageOptimizer.is_optimized(file.file)
+        ):
+            setattr(model_instance, self.attname, self.optimize(file))
         return super().pre_save(model_instance, add)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from common.models import FileCleanupJournal
+from common.services.files import drain_file_cleanup_journal
+
+
+class Command(BaseCommand):
+    help = "Deletes the files recorded in the file cleanup journal"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of journal entries processed per transaction",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=5,
+            help="Skip entries that already failed this many times",
+        )
+
+    def handle(self, *args, **options):
+        processed = drain_file_cleanup_journal(
+            batch_size=options["batch_size"], max_attempts=options["max_attempts"]
+        )
+        remaining = FileCleanupJournal.objects.count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{processed} journal entries processed, {remaining} left."
+            )
+        )
@@ -25,3 +25,17 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+# --- FILE CLEANUP ---
+
+
+class FileCleanupJournal(models.Model):
+    field = models.CharField(max_length=255)
+    name = models.CharField(max_length=500)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,15 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# --- CACHE BACKENDS ---
+
+
+def is_cache_shared(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Whether a cache is shared by every process. Local memory and dummy
+    caches are not, so invalidating an entry in one process leaves it stale
+    in the others.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -0,0 +1,137 @@
+import logging
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from common.models import FileCleanupJournal
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- JOURNAL ---
+
+
+def get_field_label(field):
+    """Label a file field is journaled under: `app_label.model_name.field_name`"""
+    return f"{field.model._meta.label_lower}.{field.name}"
+
+
+def get_journaled_field(field_label):
+    """File field an entry was journaled under, or None if it no longer exists"""
+    app_label, model_name, field_name = field_label.split(".")
+    try:
+        return apps.get_model(app_label, model_name)._meta.get_field(field_name)
+    except (LookupError, FieldDoesNotExist):
+        return None
+
+
+def journal_files(field, names, using=None):
+    """
+    Records the files of a field for deletion by `cleanup_files`.
+
+    The entries are written in the current transaction, so they are rolled
+    back together with the change that orphaned the files.
+    """
+    journal_field_files([(field, name) for name in names], using=using)
+
+
+def journal_field_files(files, using=None):
+    """Like `journal_files`, for (field, name) pairs of any number of fields"""
+    FileCleanupJournal.objects.using(using or DEFAULT_DB_ALIAS).bulk_create(
+        [
+            FileCleanupJournal(field=get_field_label(field), name=name)
+            for field, name in files
+            if name
+        ],
+        batch_size=1000,
+    )
+
+
+# --- CLEANUP ---
+
+
+def delete_stored_files(storage, names):
+    """
+    Deletes files from storage and returns a {name: error} mapping of the
+    ones that could not be deleted.
+    """
+    errors = {}
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.error(f"Error deleting file {name}: {e}")
+            errors[name] = str(e)
+    return errors
+
+
+@transaction.atomic
+def process_file_cleanup_batch(batch_size=500, max_attempts=5, after_id=0):
+    """
+    Deletes the files of a batch of journal entries after `after_id` and
+    returns the processed entries. Entries are locked so several workers can
+    run at once.
+
+    A file is only deleted once no row of its model holds it any more;
+    entries of files still in use are dropped. The variants of a file are
+    deleted along with it.
+    """
+    entries = list(
+        FileCleanupJournal.objects.select_for_update(skip_locked=True)
+        .filter(id__gt=after_id, attempts__lt=max_attempts)
+        .order_by("id")[:batch_size]
+    )
+
+    errors = {}
+    referenced = set()
+    for field_label in {entry.field for entry in entries}:
+        names = {entry.name for entry in entries if entry.field == field_label}
+        field = get_journaled_field(field_label)
+        if field is None:
+            errors.update(delete_stored_files(default_storage, names))
+            continue
+
+        # A file that a row still holds is not deleted, only its entry is
+        referenced.update(
+            (field_label, name)
+            for name in field.model._base_manager.filter(
+                **{f"{field.attname}__in": names}
+            ).values_list(field.attname, flat=True)
+        )
+        for name in names:
+            if (field_label, name) in referenced:
+                continue
+            file = field.attr_class(None, field, name)
+            stored_names = (
+                field.get_stored_names(file)
+                if hasattr(field, "get_stored_names")
+                else [name]
+            )
+            file_errors = delete_stored_files(field.storage, stored_names)
+            if file_errors:
+                errors[name] = "; ".join(file_errors.values())
+
+    failed = [entry for entry in entries if entry.name in errors]
+    FileCleanupJournal.objects.filter(
+        id__in=[entry.id for entry in entries if entry.name not in errors]
+    ).delete()
+    for entry in failed:
+        entry.attempts = F("attempts") + 1
+        entry.error = errors[entry.name]
+    FileCleanupJournal.objects.bulk_update(failed, ["attempts", "error"])
+    return entries
+
+
+def drain_file_cleanup_journal(batch_size=500, max_attempts=5):
+    """
+    Deletes every journaled file once and returns the number of processed
+    entries. Failed entries are retried by the next run.
+    """
+    processed = 0
+    after_id = 0
+    while entries := process_file_cleanup_batch(batch_size, max_attempts, after_id):
+        processed += len(entries)
+        after_id = entries[-1].id
+    return processed
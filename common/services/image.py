@@ -11,6 +11,12 @@ import pillow_avif  # noqa (Required for AVIF support)
 logger = logging.getLogger(__name__)
 
 
+class OptimizedContentFile(ContentFile):
+    """Marks content that is already optimized and must not be re-encoded"""
+
+    optimized = True
+
+
 class ImageOptimizer:
     """Utility class for image optimization and conversion"""
 
@@ -19,6 +25,43 @@ class ImageOptimizer:
     DEFAULT_QUALITY = 75
     MAX_DIMENSIONS = (1920, 1080)
 
+    # Encoder settings per kind of image. "photo" favours size over speed,
+    # "graphics" is for machine-generated images such as QR labels: lossless
+    # at a fast effort level, and only resampled to fit explicitly given
+    # max_dimensions, not the site-wide default, so edges stay sharp.
+    PRESETS = {
+        "photo": {
+            "webp": {"method": 6},
+            "avif": {"speed": 6},
+            "resize": True,
+        },
+        "graphics": {
+            "webp": {"method": 1, "lossless": True, "quality": 0},
+            "avif": {"speed": 10},
+            "resize": False,
+        },
+    }
+    DEFAULT_PRESET = "photo"
+
+    @staticmethod
+    def is_optimized(file) -> bool:
+        """Whether a file holds content produced by `optimize_image`"""
+        return getattr(file, "optimized", False)
+
+    @classmethod
+    def get_format(cls, format: Optional[str] = None) -> str:
+        """Output format for a requested format, falling back to the default"""
+        format = (
+            format or getattr(settings, "IMAGE_CONVERSION_FORMAT", cls.DEFAULT_FORMAT)
+        ).lower()
+        return format if format in cls.ALLOWED_FORMATS else cls.DEFAULT_FORMAT
+
+    @staticmethod
+    def fit_size(size: Tuple[int, int], max_dimensions: Tuple[int, int]):
+        """Size of an image scaled down to fit within max_dimensions"""
+        ratio = min(max_dimensions[0] / size[0], max_dimensions[1] / size[1], 1)
+        return (max(1, round(size[0] * ratio)), max(1, round(size[1] * ratio)))
+
     @classmethod
     def optimize_image(
         cls,
@@ -26,36 +69,51 @@ class ImageOptimizer:
         format: Optional[str] = None,
         quality: Optional[int] = None,
         max_dimensions: Optional[Tuple[int, int]] = None,
+        preset: Optional[str] = None,
+        name: Optional[str] = None,
+        resize: Optional[bool] = None,
     ) -> ContentFile:
         """
         Optimizes and converts images while preserving quality and transparency.
 
         Args:
-            image_field: The uploaded image file
+            image_field: The uploaded image file, or an already decoded PIL image
             format: Output format (webp/avif)
             quality: Compression quality (1-100)
             max_dimensions: Maximum (width, height) tuple
+            preset: Encoder preset (photo/graphics)
+            name: File name, defaults to the name of `image_field`
+            resize: Whether to fit into max_dimensions, defaults to the preset's,
+                or to True when max_dimensions is given
         """
-        format = (
-            format or getattr(settings, "IMAGE_CONVERSION_FORMAT", cls.DEFAULT_FORMAT)
-        ).lower()
+        if resize is None and max_dimensions is not None:
+            resize = True
+        format = cls.get_format(format)
         quality = quality or getattr(
             settings, "IMAGE_CONVERSION_QUALITY", cls.DEFAULT_QUALITY
         )
         max_dimensions = max_dimensions or getattr(
             settings, "IMAGE_MAX_DIMENSIONS", cls.MAX_DIMENSIONS
         )
-
-        if format not in cls.ALLOWED_FORMATS:
-            format = cls.DEFAULT_FORMAT
+        preset = cls.PRESETS.get(preset or cls.DEFAULT_PRESET, cls.PRESETS["photo"])
+        is_decoded = isinstance(image_field, Image.Image)
+        name = name or image_field.name
 
         try:
-            img = Image.open(image_field)
+            img = image_field if is_decoded else Image.open(image_field)
 
             # Preserve color profile and metadata
             icc_profile = img.info.get("icc_profile")
             exif = img.info.get("exif")
 
+            exceeds = img.size[0] > max_dimensions[0] or img.size[1] > max_dimensions[1]
+            resize = exceeds and (preset["resize"] if resize is None else resize)
+
+            # Let JPEG decode at a reduced scale (1/2 to 1/8) that is still at
+            # least the target size, thumbnail() resamples the rest
+            if resize and not is_decoded:
+                img.draft(None, cls.fit_size(img.size, max_dimensions))
+
             # Convert color mode to support transparency
             img = (
                 img.convert("RGBA")
@@ -64,8 +122,10 @@ class ImageOptimizer:
             )
 
             # Resize if image exceeds maximum dimensions
-            if img.size[0] > max_dimensions[0] or img.size[1] > max_dimensions[1]:
-                img.thumbnail(max_dimensions, Image.Resampling.LANCZOS)
+            if resize:
+                img.thumbnail(
+                    max_dimensions, Image.Resampling.LANCZOS, reducing_gap=2.0
+                )
 
             # Prepare buffer for saving
             buffer = io.BytesIO()
@@ -82,20 +142,22 @@ class ImageOptimizer:
                 save_kwargs["exif"] = exif
 
             if format == "avif":
-                save_kwargs["speed"] = 6  # Balance between speed and compression
+                save_kwargs.update(preset["avif"])
                 img.save(buffer, format="AVIF", **save_kwargs)
             else:
-                save_kwargs["method"] = 6  # Best compression
                 save_kwargs["lossless"] = (
                     img.mode == "RGBA"
                 )  # Use lossless for transparent images
+                save_kwargs.update(preset["webp"])
                 img.save(buffer, format="WEBP", **save_kwargs)
 
             # Generate filename without nesting directories
-            filename = f"{os.path.splitext(image_field.name)[0]}.{format}"
+            filename = f"{os.path.splitext(name)[0]}.{format}"
 
-            return ContentFile(buffer.getvalue(), name=filename)
+            return OptimizedContentFile(buffer.getvalue(), name=filename)
 
         except Exception as e:
             logger.error(f"Error processing image: {e}")
+            if is_decoded:
+                raise
             return image_field
@@ -116,6 +116,26 @@ DATABASES = {
     "default": dj_database_url.parse(DATABASE_URL, conn_max_age=600),
 }
 
+# --- CACHE CONFIGURATION ---
+# A cache shared by all processes, e.g. redis://localhost:6379/0 (needs the
+# redis package) or db://<table> (run `manage.py createcachetable`). Without
+# one, permissions and users are only cached within a request.
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL and CACHE_URL.startswith("db://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": CACHE_URL.removeprefix("db://"),
+        }
+    }
+elif CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+
 # --- AUTH USER MODEL ---
 AUTH_USER_MODEL = "users.User"
 
@@ -126,6 +146,12 @@ AUTHENTICATION_BACKENDS = (
     "guardian.backends.ObjectPermissionBackend",
 )
 
+# Seconds a user's effective permissions stay in the shared cache (changes
+# invalidate them)
+USER_PERMISSIONS_CACHE_TIMEOUT = int(os.getenv("USER_PERMISSIONS_CACHE_TIMEOUT", 600))
+# Seconds an authenticated user is served from the cache between requests
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 60))
+
 # --- PASSWORD VALIDATORS ---
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -232,5 +258,28 @@ NINJA_JWT = {
     "AUTH_HEADER_NAME": "HTTP_AUTHORIZATION",
 }
 
+# --- SCANNER CONFIGURATION ---
+# Maximum number of queued scans accepted in one bulk upload
+SCAN_BULK_MAX_SIZE = int(os.getenv("SCAN_BULK_MAX_SIZE", 500))
+# How far in the past (seconds) the capture time of a queued scan may be;
+# earlier or future capture times from a wrong device clock are clamped
+SCAN_MAX_CAPTURE_AGE = int(os.getenv("SCAN_MAX_CAPTURE_AGE", 7 * 24 * 3600))
+
+# --- QR CODE CONFIGURATION ---
+# "stored" renders QR images to media storage, "on_demand" renders them per request
+QR_IMAGE_MODE = os.getenv("QR_IMAGE_MODE", "stored")
+# Label format of QR images, "png" or "svg" (fields with format="svg" are always SVG)
+QR_LABEL_FORMAT = os.getenv("QR_LABEL_FORMAT", "png")
+# Memory budget of the in-process cache of on-demand QR images
+QR_IMAGE_CACHE_BYTES = int(os.getenv("QR_IMAGE_CACHE_BYTES", 64 * 1024 * 1024))
+# How long browsers and proxies may reuse an on-demand QR image
+QR_IMAGE_MAX_AGE = int(os.getenv("QR_IMAGE_MAX_AGE", 86400))
+
+# --- EXPORT CONFIGURATION ---
+# Directory of the partitioned Parquet event log written by export_event_log
+EVENT_LOG_EXPORT_DIR = os.getenv(
+    "EVENT_LOG_EXPORT_DIR", BASE_DIR / "exports" / "event_log"
+)
+
 # --- UNFOLD CONFIGURATION ---
 UNFOLD = UNFOLD_CONFIG
@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from common.models import FileCleanupJournal
+from common.services.files import drain_file_cleanup_journal, journal_files
+from tracker.models import Bundle, MaterialPiece
+from tracker.services.rendering import drain_qr_render_queue, enqueue_qr_render
+
+
+@pytest.fixture
+def stored_images(media_root, bundles):
+    """Storage names of the rendered QR images of every piece and bundle"""
+    drain_qr_render_queue(workers=1)
+    names = []
+    for model in (MaterialPiece, Bundle):
+        for obj in model.objects.all():
+            names += obj.qr_image.field.get_stored_names(obj.qr_image)
+    return names
+
+
+def exists(name):
+    return MaterialPiece._meta.get_field("qr_image").storage.exists(name)
+
+
+# --- JOURNAL ---
+
+
+def test_delete_journals_every_file_with_one_insert(production_batch, stored_images):
+    journal_table = FileCleanupJournal._meta.db_table
+    image_count = MaterialPiece.objects.count() + Bundle.objects.count()
+
+    with CaptureQueriesContext(connection) as queries:
+        production_batch.delete()
+
+    inserts = [
+        query
+        for query in queries
+        if query["sql"].startswith("INSERT") and journal_table in query["sql"]
+    ]
+    assert len(inserts) == 1
+    assert FileCleanupJournal.objects.count() == image_count
+    # Nothing is deleted from storage before the cleanup runs
+    assert stored_images
+    assert all(exists(name) for name in stored_images)
+
+
+def test_rolled_back_delete_journals_nothing(bundles, stored_images):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            Bundle.objects.get(pk=bundles[0].pk).delete()
+            raise RuntimeError
+
+    assert not FileCleanupJournal.objects.exists()
+
+
+def test_rerendered_images_journal_the_replaced_files(bundles, stored_images):
+    piece = MaterialPiece.objects.filter(bundle=bundles[0]).first()
+    old_name = piece.qr_image.name
+
+    enqueue_qr_render(material_pieces=[piece])
+    drain_qr_render_queue(workers=1)
+
+    piece.refresh_from_db()
+    assert piece.qr_image.name != old_name
+    assert list(FileCleanupJournal.objects.values_list("name", flat=True)) == [old_name]
+
+
+# --- CLEANUP ---
+
+
+def test_cleanup_deletes_journaled_files_and_variants(production_batch, stored_images):
+    production_batch.delete()
+
+    drain_file_cleanup_journal()
+
+    assert not any(exists(name) for name in stored_images)
+    assert not FileCleanupJournal.objects.exists()
+
+
+def test_cleanup_keeps_files_still_in_use(bundles, stored_images):
+    piece = MaterialPiece.objects.filter(bundle=bundles[0]).first()
+    names = piece.qr_image.field.get_stored_names(piece.qr_image)
+    journal_files(piece.qr_image.field, [piece.qr_image.name])
+
+    drain_file_cleanup_journal()
+
+    assert all(exists(name) for name in names)
+    assert not FileCleanupJournal.objects.exists()
@@ -1,4 +1,11 @@
 import pytest
+from tests.factories import (
+    BundleFactory,
+    ProductionBatchFactory,
+    ProductionLineFactory,
+    ScannerFactory,
+)
+from tracker.models import Scanner
 
 
 # --- FIXTURES ---
@@ -7,3 +14,34 @@ import pytest
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
     pass
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def production_lines():
+    return ProductionLineFactory.create_batch(2)
+
+
+@pytest.fixture
+def scanners(production_lines):
+    """Scanners of every type on each line, keyed by (line index, scanner type)"""
+    return {
+        (index, scanner_type): ScannerFactory(production_line=line, type=scanner_type)
+        for index, line in enumerate(production_lines)
+        for scanner_type in Scanner.ScannerType.values
+    }
+
+
+@pytest.fixture
+def production_batch():
+    return ProductionBatchFactory()
+
+
+@pytest.fixture
+def bundles(production_batch):
+    return BundleFactory.create_batch(3, production_batch=production_batch, quantity=4)
@@ -0,0 +1,123 @@
+import datetime
+import factory
+from factory.django import DjangoModelFactory
+from tracker.models import (
+    Buyer,
+    Bundle,
+    Color,
+    Defect,
+    Material,
+    MaterialType,
+    Operation,
+    Order,
+    ProductionBatch,
+    ProductionLine,
+    Scanner,
+    Season,
+    Size,
+    Style,
+)
+
+
+class BuyerFactory(DjangoModelFactory):
+    class Meta:
+        model = Buyer
+
+    name = factory.Sequence(lambda n: f"Buyer {n}")
+
+
+class SeasonFactory(DjangoModelFactory):
+    class Meta:
+        model = Season
+
+    name = factory.Sequence(lambda n: f"Season {n}")
+
+
+class StyleFactory(DjangoModelFactory):
+    class Meta:
+        model = Style
+
+    name = factory.Sequence(lambda n: f"Style {n}")
+
+
+class OrderFactory(DjangoModelFactory):
+    class Meta:
+        model = Order
+
+    buyer = factory.SubFactory(BuyerFactory)
+    season = factory.SubFactory(SeasonFactory)
+    style = factory.SubFactory(StyleFactory)
+    order_number = factory.Sequence(lambda n: f"ORD-{n}")
+    delivery_date = factory.LazyFunction(datetime.date.today)
+
+
+class MaterialTypeFactory(DjangoModelFactory):
+    class Meta:
+        model = MaterialType
+
+    name = factory.Sequence(lambda n: f"Material Type {n}")
+
+
+class MaterialFactory(DjangoModelFactory):
+    class Meta:
+        model = Material
+
+    name = factory.Sequence(lambda n: f"Material {n}")
+    material_type = factory.SubFactory(MaterialTypeFactory)
+
+
+class SizeFactory(DjangoModelFactory):
+    class Meta:
+        model = Size
+
+    name = factory.Sequence(lambda n: f"Size {n}")
+
+
+class ColorFactory(DjangoModelFactory):
+    class Meta:
+        model = Color
+
+    name = factory.Sequence(lambda n: f"Color {n}")
+
+
+class ProductionBatchFactory(DjangoModelFactory):
+    class Meta:
+        model = ProductionBatch
+
+    order = factory.SubFactory(OrderFactory)
+    batch_number = factory.Sequence(lambda n: f"{n}")
+
+
+class BundleFactory(DjangoModelFactory):
+    class Meta:
+        model = Bundle
+
+    production_batch = factory.SubFactory(ProductionBatchFactory)
+    material = factory.SubFactory(MaterialFactory)
+    size = factory.SubFactory(SizeFactory)
+    color = factory.SubFactory(ColorFactory)
+    quantity = 5
+
+
+class ProductionLineFactory(DjangoModelFactory):
+    class Meta:
+        model = ProductionLine
+
+    name = factory.Sequence(lambda n: f"Line {n}")
+
+
+class ScannerFactory(DjangoModelFactory):
+    class Meta:
+        model = Scanner
+
+    name = factory.Sequence(lambda n: f"Scanner {n}")
+    production_line = factory.SubFactory(ProductionLineFactory)
+    type = Scanner.ScannerType.IN
+
+
+class DefectFactory(DjangoModelFactory):
+    class Meta:
+        model = Defect
+
+    name = factory.Sequence(lambda n: f"Defect {n}")
+    type = Operation.OperationCategory.SEWING
@@ -0,0 +1,105 @@
+import html
+import re
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tests.factories import BundleFactory, DefectFactory
+from tracker.models import Bundle, MaterialPiece, QualityCheck, Scanner
+from tracker.services.scanning import ingest_scan
+
+NEXT_PAGE_LINK = re.compile(r'href="(\?[^"]*cursor=[^"]*)"[^>]*>\s*Next')
+
+
+def create_scanned_bundles(production_batch, scanners, count):
+    """Bundles of two pieces, quality checked with a defect"""
+    defect = DefectFactory()
+    for _ in range(count):
+        bundle = BundleFactory(production_batch=production_batch, quantity=2)
+        ingest_scan(
+            scanners[0, Scanner.ScannerType.QC],
+            list(bundle.material_pieces.all()),
+            quality_status=QualityCheck.QualityStatus.REJECTED,
+            defect_ids=[defect.id],
+        )
+
+
+def count_changelist_queries(client, model):
+    url = reverse(f"admin:tracker_{model._meta.model_name}_changelist")
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+# --- CHANGELIST QUERIES ---
+
+
+@pytest.mark.parametrize("model", [Bundle, MaterialPiece, QualityCheck])
+def test_changelist_queries_do_not_grow_with_rows(
+    admin_client, production_batch, scanners, model
+):
+    create_scanned_bundles(production_batch, scanners, 2)
+    few_rows = count_changelist_queries(admin_client, model)
+
+    create_scanned_bundles(production_batch, scanners, 8)
+    many_rows = count_changelist_queries(admin_client, model)
+
+    assert many_rows == few_rows
+
+
+# --- KEYSET PAGINATION ---
+
+
+def test_keyset_pagination_walks_every_row_once(
+    admin_client, production_batch, monkeypatch
+):
+    BundleFactory.create_batch(4, production_batch=production_batch, quantity=3)
+    monkeypatch.setattr(admin.site._registry[MaterialPiece], "list_per_page", 5)
+    url = reverse("admin:tracker_materialpiece_changelist")
+
+    seen = []
+    query_string = ""
+    while True:
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(url + query_string)
+        assert response.status_code == 200
+        content = response.content.decode()
+        seen += list(
+            dict.fromkeys(
+                int(pk)
+                for pk in re.findall(r"/tracker/materialpiece/(\d+)/change/", content)
+            )
+        )
+        if query_string:
+            # Pages after the first are not counted
+            assert not any("COUNT(" in query["sql"] for query in queries)
+
+        next_page = NEXT_PAGE_LINK.search(content)
+        if next_page is None:
+            break
+        query_string = html.unescape(next_page.group(1))
+
+    assert seen == list(
+        MaterialPiece.objects.order_by("-pk").values_list("pk", flat=True)
+    )
+
+
+def test_keyset_pagination_rejects_invalid_cursors(admin_client):
+    url = reverse("admin:tracker_materialpiece_changelist")
+
+    response = admin_client.get(url, {"cursor": "not-a-cursor"})
+
+    # The admin redirects lookups it cannot apply to an error page
+    assert response.status_code == 302
+
+
+def test_sorted_changelists_use_page_numbers(admin_client, production_batch):
+    BundleFactory(production_batch=production_batch, quantity=3)
+    url = reverse("admin:tracker_materialpiece_changelist")
+
+    response = admin_client.get(url, {"o": "1"})
+
+    assert response.status_code == 200
+    assert "cursor=" not in response.content.decode()
@@ -0,0 +1,56 @@
+import pytest
+from tracker.models import ScanEvent, Scanner
+from tracker.services.event_log import export_event_log, read_export_state
+from tracker.services.scanning import ingest_scan
+
+pyarrow_dataset = pytest.importorskip("pyarrow.dataset")
+
+
+def read_event_ids(output_dir):
+    dataset = pyarrow_dataset.dataset(output_dir, format="parquet", partitioning="hive")
+    return sorted(dataset.to_table().column("event_id").to_pylist())
+
+
+def test_export_appends_new_events_only(tmp_path, bundles, scanners):
+    ingest_scan(
+        scanners[0, Scanner.ScannerType.IN], list(bundles[0].material_pieces.all())
+    )
+    assert export_event_log(tmp_path)[0] == 4
+    assert export_event_log(tmp_path)[0] == 0
+
+    ingest_scan(
+        scanners[0, Scanner.ScannerType.IN], list(bundles[1].material_pieces.all())
+    )
+    assert export_event_log(tmp_path)[0] == 4
+
+    assert read_event_ids(tmp_path) == list(
+        ScanEvent.objects.order_by("id").values_list("id", flat=True)
+    )
+
+
+def test_export_picks_up_events_committed_out_of_id_order(tmp_path, bundles, scanners):
+    ingest_scan(
+        scanners[0, Scanner.ScannerType.IN], list(bundles[0].material_pieces.all())
+    )
+    # One event's transaction has not committed when the export runs
+    late_event = ScanEvent.objects.order_by("id")[1]
+    ScanEvent.objects.filter(pk=late_event.pk).delete()
+
+    exported, last_event_id = export_event_log(tmp_path)
+
+    assert exported == 3
+    assert read_export_state(tmp_path)["pending_event_ids"] == [late_event.pk]
+
+    late_event.save(force_insert=True)
+    assert export_event_log(tmp_path) == (1, last_event_id)
+    assert read_export_state(tmp_path)["pending_event_ids"] == []
+
+    ingest_scan(
+        scanners[0, Scanner.ScannerType.IN], list(bundles[1].material_pieces.all())
+    )
+    export_event_log(tmp_path)
+
+    event_ids = read_event_ids(tmp_path)
+    assert event_ids == list(
+        ScanEvent.objects.order_by("id").values_list("id", flat=True)
+    )
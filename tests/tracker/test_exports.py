@@ -0,0 +1,31 @@
+import csv
+import io
+from tracker.models import ScanEvent, Scanner
+from tracker.services.exports import EXCEL_BOM, stream_scan_events_csv
+from tracker.services.scanning import ingest_scan
+
+
+def read_csv(lines):
+    return list(csv.reader(io.StringIO("".join(lines).removeprefix(EXCEL_BOM))))
+
+
+def test_excel_export_escapes_formulas(bundles, scanners):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    Scanner.objects.filter(pk=scanner.pk).update(name='=HYPERLINK("http://x")')
+    scanner.refresh_from_db()
+    ingest_scan(scanner, list(bundles[0].material_pieces.all()))
+
+    excel_rows = read_csv(stream_scan_events_csv(ScanEvent.objects.all(), excel=True))
+    rows = read_csv(stream_scan_events_csv(ScanEvent.objects.all()))
+
+    scanner_column = excel_rows[0].index("Scanner")
+    assert {row[scanner_column] for row in excel_rows[1:]} == {
+        '\'=HYPERLINK("http://x")'
+    }
+    assert {row[scanner_column] for row in rows[1:]} == {'=HYPERLINK("http://x")'}
+
+
+def test_excel_export_starts_with_a_byte_order_mark(bundles):
+    lines = list(stream_scan_events_csv(ScanEvent.objects.all(), excel=True))
+
+    assert lines[0] == EXCEL_BOM
@@ -0,0 +1,162 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from tests.factories import BundleFactory, ProductionBatchFactory
+from tracker.models import (
+    Bundle,
+    MaterialPiece,
+    ProductionLineRollup,
+    QualityCheck,
+    Scanner,
+)
+from tracker.services.dashboard import (
+    COUNTER_FIELDS,
+    compute_line_totals,
+    get_rollup_totals,
+)
+from tracker.services.rollups import invalidate_rollups
+from tracker.services.scanning import ingest_scan
+
+
+def assert_rollups_match(production_batch):
+    """
+    The stored rollups of a batch equal its counters computed live. A batch
+    without rollups is computed live by the dashboard, so it matches too.
+    """
+    rollups = get_rollup_totals(production_batch)
+    if not rollups:
+        return
+    totals = compute_line_totals(production_batch)
+    empty = dict.fromkeys(COUNTER_FIELDS, 0)
+    for line_id in set(rollups) | set(totals):
+        assert rollups.get(line_id, empty) == totals.get(line_id, empty)
+
+
+def assert_rollups_match_after_next_scan(production_batch, scanner):
+    """The next scan of a batch leaves it with complete, matching rollups"""
+    assert_rollups_match(production_batch)
+    bundle = BundleFactory(production_batch=production_batch, quantity=2)
+    ingest_scan(scanner, list(bundle.material_pieces.all()))
+    assert get_rollup_totals(production_batch)
+    assert_rollups_match(production_batch)
+
+
+@pytest.fixture
+def scanned_batch(production_batch, bundles, scanners):
+    """A batch scanned through both lines with every QC outcome"""
+    pieces = list(MaterialPiece.objects.filter(bundle__in=bundles).order_by("id"))
+    statuses = QualityCheck.QualityStatus.values
+    for line in (0, 1):
+        ingest_scan(scanners[line, Scanner.ScannerType.IN], pieces)
+        for index, status in enumerate(statuses):
+            ingest_scan(
+                scanners[line, Scanner.ScannerType.QC],
+                pieces[index :: len(statuses)],
+                quality_status=status,
+                rework_notes="Fix it",
+            )
+        ingest_scan(scanners[line, Scanner.ScannerType.OUT], pieces[::2])
+    return production_batch
+
+
+# --- SCANS ---
+
+
+def test_rollups_follow_scans(scanned_batch):
+    assert get_rollup_totals(scanned_batch)
+    assert_rollups_match(scanned_batch)
+
+
+def test_rollups_of_other_batches_are_left_alone(scanned_batch, scanners):
+    other_batch = ProductionBatchFactory()
+    bundle = BundleFactory(production_batch=other_batch, quantity=3)
+    rollups = get_rollup_totals(scanned_batch)
+
+    ingest_scan(scanners[0, Scanner.ScannerType.IN], list(bundle.material_pieces.all()))
+
+    assert get_rollup_totals(scanned_batch) == rollups
+    assert_rollups_match(other_batch)
+
+
+def test_first_scan_rebuilds_a_batch_without_rollups(scanned_batch, bundles, scanners):
+    invalidate_rollups([scanned_batch.id])
+    # Every other piece has not left the lines yet
+    piece = MaterialPiece.objects.filter(bundle=bundles[0]).order_by("id")[1]
+
+    ingest_scan(scanners[1, Scanner.ScannerType.OUT], [piece])
+
+    assert get_rollup_totals(scanned_batch)
+    assert_rollups_match(scanned_batch)
+
+
+# --- CHANGES ---
+
+
+def test_rollups_follow_deleted_bundles(scanned_batch, bundles, scanners):
+    Bundle.objects.get(pk=bundles[0].pk).delete()
+
+    assert_rollups_match_after_next_scan(
+        scanned_batch, scanners[0, Scanner.ScannerType.IN]
+    )
+
+
+def test_rollups_follow_deleted_pieces(scanned_batch, bundles, scanners):
+    MaterialPiece.objects.filter(bundle=bundles[1]).first().delete()
+    assert_rollups_match(scanned_batch)
+
+    piece_ids = MaterialPiece.objects.filter(bundle=bundles[2]).values_list(
+        "pk", flat=True
+    )
+    MaterialPiece.objects.filter(pk__in=list(piece_ids[:2])).delete()
+
+    assert_rollups_match_after_next_scan(
+        scanned_batch, scanners[0, Scanner.ScannerType.IN]
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"production_line": 1},
+        {"type": Scanner.ScannerType.IN},
+        None,
+    ],
+)
+def test_rollups_follow_scanner_changes(
+    scanned_batch, scanners, production_lines, change
+):
+    scanner = Scanner.objects.get(pk=scanners[0, Scanner.ScannerType.OUT].pk)
+    if change is None:
+        scanner.delete()
+    else:
+        if "production_line" in change:
+            change["production_line"] = production_lines[change["production_line"]]
+        for field, value in change.items():
+            setattr(scanner, field, value)
+        scanner.save()
+
+    assert_rollups_match_after_next_scan(
+        scanned_batch, scanners[1, Scanner.ScannerType.IN]
+    )
+
+
+def test_rollups_follow_pieces_moved_between_batches(scanned_batch, bundles, scanners):
+    other_batch = ProductionBatchFactory()
+    other_bundle = BundleFactory(production_batch=other_batch, quantity=1)
+    piece = MaterialPiece.objects.filter(bundle=bundles[0]).first()
+
+    piece.bundle = other_bundle
+    piece.save()
+
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    assert_rollups_match_after_next_scan(scanned_batch, scanner)
+    assert_rollups_match_after_next_scan(other_batch, scanner)
+
+
+def test_deleting_a_batch_drops_its_rollups_in_few_queries(scanned_batch):
+    with CaptureQueriesContext(connection) as queries:
+        scanned_batch.delete()
+
+    assert not ProductionLineRollup.objects.exists()
+    # Cascades are handled once per delete, not once per scan event
+    assert len(queries) < 40
@@ -0,0 +1,259 @@
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from tests.factories import BundleFactory, DefectFactory
+from tracker.models import (
+    MaterialPiece,
+    QualityCheck,
+    ScanEvent,
+    Scanner,
+    ScanSubmission,
+)
+from tracker.services import scanning
+from tracker.services.scanning import ingest_scan, process_scan_batch
+
+
+# --- INGESTION ---
+
+
+def test_ingest_scan_records_every_piece(bundles, scanners):
+    pieces = list(MaterialPiece.objects.filter(bundle=bundles[0]))
+
+    scanned = ingest_scan(scanners[0, Scanner.ScannerType.IN], pieces)
+
+    assert {piece.id for piece in scanned} == {piece.id for piece in pieces}
+    assert ScanEvent.objects.filter(material_piece__in=pieces).count() == len(pieces)
+    assert set(
+        MaterialPiece.objects.filter(bundle=bundles[0]).values_list(
+            "current_production_line", flat=True
+        )
+    ) == {scanners[0, Scanner.ScannerType.IN].production_line_id}
+
+
+def test_ingest_scan_skips_pieces_already_scanned(bundles, scanners):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    pieces = list(MaterialPiece.objects.filter(bundle=bundles[0]))
+    ingest_scan(scanner, pieces[:2])
+
+    scanned = ingest_scan(scanner, pieces)
+
+    assert {piece.id for piece in scanned} == {piece.id for piece in pieces[2:]}
+    assert ingest_scan(scanner, pieces) == []
+    assert ScanEvent.objects.filter(scanner=scanner).count() == len(pieces)
+
+
+def test_ingest_scan_creates_quality_checks_with_defects(bundles, scanners):
+    defect = DefectFactory()
+    pieces = list(MaterialPiece.objects.filter(bundle=bundles[0]))
+
+    ingest_scan(
+        scanners[0, Scanner.ScannerType.QC],
+        pieces,
+        quality_status=QualityCheck.QualityStatus.REJECTED,
+        defect_ids=[defect.id],
+    )
+
+    checks = QualityCheck.objects.filter(scan_event__material_piece__in=pieces)
+    assert checks.count() == len(pieces)
+    assert QualityCheck.defects.through.objects.filter(
+        qualitycheck__in=checks, defect=defect
+    ).count() == len(pieces)
+
+
+def test_ingest_scan_retries_without_pieces_scanned_concurrently(
+    bundles, scanners, monkeypatch
+):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    pieces = list(MaterialPiece.objects.filter(bundle=bundles[0]))
+    compute_line_totals = scanning.compute_line_totals
+    calls = []
+
+    def scan_concurrently(*args, **kwargs):
+        # Another worker scans a piece between the check and the insert
+        if not calls:
+            ScanEvent.objects.bulk_create(
+                [ScanEvent(scanner=scanner, material_piece=pieces[0])]
+            )
+        calls.append(args)
+        return compute_line_totals(*args, **kwargs)
+
+    monkeypatch.setattr(scanning, "compute_line_totals", scan_concurrently)
+
+    scanned = ingest_scan(scanner, pieces)
+
+    assert {piece.id for piece in scanned} == {piece.id for piece in pieces[1:]}
+    assert ScanEvent.objects.filter(scanner=scanner).count() == len(pieces)
+
+
+def test_ingest_scan_queries_do_not_grow_with_bundle_size(production_batch, scanners):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    first, small, large = (
+        BundleFactory(production_batch=production_batch, quantity=quantity)
+        for quantity in (2, 2, 20)
+    )
+    # The first scan of a batch builds its rollups; measure the ones after it
+    ingest_scan(scanner, list(first.material_pieces.all()))
+
+    query_counts = []
+    for bundle in (small, large):
+        pieces = list(MaterialPiece.objects.filter(bundle=bundle))
+        with CaptureQueriesContext(connection) as queries:
+            ingest_scan(scanner, pieces)
+        query_counts.append(len(queries))
+
+    assert MaterialPiece.objects.filter(bundle=large).count() == 20
+    assert query_counts[0] == query_counts[1]
+
+
+# --- QUEUED SCANS ---
+
+
+def queued_scan(key, scanner, qr_code, **data):
+    return {
+        "idempotency_key": key,
+        "scanner_name": scanner.name,
+        "qr_data": qr_code,
+        **data,
+    }
+
+
+def test_process_scan_batch_applies_each_key_once(bundles, scanners):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    scans = [
+        queued_scan("scan-1", scanner, bundles[0].qr_code),
+        queued_scan("scan-2", scanner, bundles[1].qr_code),
+        queued_scan("scan-1", scanner, bundles[0].qr_code),
+    ]
+
+    results = process_scan_batch(scans)
+
+    assert [result["idempotency_key"] for result in results] == [
+        "scan-1",
+        "scan-2",
+        "scan-1",
+    ]
+    assert [result["duplicate"] for result in results] == [False, False, True]
+    assert results[2]["message"] == results[0]["message"]
+    assert ScanSubmission.objects.count() == 2
+
+    # The device sends the same queue again after a lost response
+    events = ScanEvent.objects.count()
+    results = process_scan_batch(scans)
+
+    assert all(result["duplicate"] for result in results)
+    assert ScanEvent.objects.count() == events
+
+
+def test_process_scan_batch_reports_failed_scans_on_their_own(bundles, scanners):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    scans = [
+        queued_scan("bad-qr", scanner, "99999999"),
+        {"idempotency_key": 12, "scanner_name": scanner.name},
+        queued_scan("good", scanner, bundles[0].qr_code),
+    ]
+
+    results = process_scan_batch(scans)
+
+    assert "error" in results[0] and "retry" not in results[0]
+    assert results[1] == {
+        "idempotency_key": None,
+        "error": "A valid idempotency key is required",
+    }
+    assert results[2]["status"] == "success"
+    assert list(ScanSubmission.objects.values_list("idempotency_key", flat=True)) == [
+        "good"
+    ]
+
+
+def test_process_scan_batch_contains_unexpected_errors(bundles, scanners, monkeypatch):
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    ingest = scanning.ingest_scan
+
+    def fail_on_first_bundle(scanner, material_pieces, **kwargs):
+        if material_pieces[0].bundle_id == bundles[0].id:
+            raise RuntimeError("boom")
+        return ingest(scanner, material_pieces, **kwargs)
+
+    monkeypatch.setattr(scanning, "ingest_scan", fail_on_first_bundle)
+
+    results = process_scan_batch(
+        [
+            queued_scan("fails", scanner, bundles[0].qr_code),
+            queued_scan("applies", scanner, bundles[1].qr_code),
+        ]
+    )
+
+    assert results[0]["error"] == "Scan could not be processed"
+    assert "retry" not in results[0]
+    assert results[1]["status"] == "success"
+    assert not ScanEvent.objects.filter(material_piece__bundle=bundles[0]).exists()
+
+
+def test_process_scan_batch_rejects_invalid_fields(bundles, scanners):
+    qc_scanner = scanners[0, Scanner.ScannerType.QC]
+    qr_code = bundles[0].qr_code
+
+    results = process_scan_batch(
+        [
+            queued_scan("status", qc_scanner, qr_code, quality_status="BOGUS"),
+            queued_scan(
+                "defects",
+                qc_scanner,
+                qr_code,
+                quality_status=QualityCheck.QualityStatus.REJECTED,
+                defect_ids="abc",
+            ),
+            queued_scan("time", qc_scanner, qr_code, scanned_at="yesterday"),
+        ]
+    )
+
+    assert [result["error"] for result in results] == [
+        "Invalid quality status",
+        "Defect IDs must be a list of integers",
+        "Invalid scan time",
+    ]
+    assert not ScanEvent.objects.exists()
+
+
+def test_process_scan_batch_keeps_the_capture_time(bundles, scanners, settings):
+    settings.SCAN_MAX_CAPTURE_AGE = 24 * 3600
+    scanner = scanners[0, Scanner.ScannerType.IN]
+    now = timezone.now()
+    captured_at = now - timedelta(hours=3)
+
+    process_scan_batch(
+        [
+            queued_scan(
+                "offline",
+                scanner,
+                bundles[0].qr_code,
+                scanned_at=captured_at.isoformat(),
+            ),
+            queued_scan(
+                "future",
+                scanner,
+                bundles[1].qr_code,
+                scanned_at=(now + timedelta(days=1)).isoformat(),
+            ),
+            queued_scan(
+                "too-old",
+                scanner,
+                bundles[2].qr_code,
+                scanned_at=(now - timedelta(days=3)).isoformat(),
+            ),
+        ]
+    )
+
+    def scan_times(bundle):
+        return set(
+            ScanEvent.objects.filter(material_piece__bundle=bundle).values_list(
+                "scan_time", flat=True
+            )
+        )
+
+    assert scan_times(bundles[0]) == {captured_at}
+    (future,) = scan_times(bundles[1])
+    assert now <= future <= timezone.now()
+    (oldest,) = scan_times(bundles[2])
+    assert oldest >= now - timedelta(seconds=settings.SCAN_MAX_CAPTURE_AGE)
@@ -1,9 +1,18 @@
 from django.contrib import admin
+from django.db.models import Count
+from django.urls import reverse
 from django.utils.html import format_html
-from common.admin import BaseModelAdmin, TabularInline
+from common.admin import (
+    AutocompleteFilter,
+    BaseModelAdmin,
+    TabularInline,
+    is_autocomplete_request,
+)
+from tracker.services.exports import scan_events_csv_response
 from tracker.utils import (
     render_qr_code,
     render_combined_qr_codes,
+    render_print_sheet_link,
 )
 from tracker.models import (
     Buyer,
@@ -161,7 +170,8 @@ class ProductionTargetAdmin(BaseModelAdmin):
         "actual_quantity",
         "efficiency",
     )
-    list_filter = ("production_line", "style", "date")
+    list_filter = ("production_line", ("style", AutocompleteFilter), "date")
+    list_filter_submit = True
 
     def efficiency(self, obj):
         efficiency = obj.efficiency_percentage()
@@ -179,12 +189,14 @@ class ProductionTargetAdmin(BaseModelAdmin):
 @admin.register(Style)
 class StyleAdmin(BaseModelAdmin):
     list_display = ("name", "created_at", "updated_at")
+    search_fields = ("name__startswith",)
 
 
 @admin.register(Order)
 class OrderAdmin(BaseModelAdmin):
     list_display = ("buyer", "season", "style", "order_number", "delivery_date")
-    list_filter = ("buyer", "season", "style")
+    list_filter = ("buyer", "season", ("style", AutocompleteFilter))
+    list_filter_submit = True
     inlines = [OrderItemInline]
 
 
@@ -192,6 +204,8 @@ class OrderAdmin(BaseModelAdmin):
 class MaterialAdmin(BaseModelAdmin):
     list_display = ("material_type", "name", "unit", "color")
     list_filter = ("material_type",)
+    list_select_related = ("material_type", "color")
+    search_fields = ("name__startswith",)
 
 
 @admin.register(Bundle)
@@ -202,12 +216,31 @@ class BundleAdmin(BaseModelAdmin):
         "size",
         "color",
         "quantity",
+        "piece_count",
         "qr_code",
         "qr_image_display",
-        "print_pieces_qr_codes",
     )
-    list_filter = ("production_batch", "material", "size", "color")
-    readonly_fields = ["qr_code", "qr_image_display", "print_pieces_qr_codes"]
+    list_filter = (
+        ("production_batch", AutocompleteFilter),
+        ("material", AutocompleteFilter),
+        "size",
+        "color",
+    )
+    list_filter_submit = True
+    search_fields = ("qr_code__startswith",)
+    list_select_related = (
+        "production_batch__order__style",
+        "material__material_type",
+        "material__color",
+        "size",
+        "color",
+    )
+    readonly_fields = [
+        "qr_code",
+        "qr_image_display",
+        "print_pieces_qr_codes",
+        "print_sheet",
+    ]
     fields = [
         "production_batch",
         "material",
@@ -216,6 +249,7 @@ class BundleAdmin(BaseModelAdmin):
         "quantity",
         "qr_image_display",
         "print_pieces_qr_codes",
+        "print_sheet",
     ]
     inlines = [MaterialPieceInline]
 
@@ -224,15 +258,38 @@ class BundleAdmin(BaseModelAdmin):
 
     qr_image_display.short_description = "QR Code"
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_autocomplete_request(request):
+            return queryset
+        return queryset.annotate(piece_count=Count("material_pieces"))
+
+    def piece_count(self, obj):
+        return obj.piece_count
+
+    piece_count.short_description = "Pieces"
+    piece_count.admin_order_field = "piece_count"
+
     def print_pieces_qr_codes(self, obj):
-        pieces = obj.material_pieces.all()
-        return render_combined_qr_codes(pieces)
+        if not obj.pk:
+            return "-"
+        return render_combined_qr_codes(
+            reverse("bundle_pieces_qr_codes", args=[obj.pk])
+        )
 
     print_pieces_qr_codes.short_description = "Print All Pieces QR Codes"
 
+    def print_sheet(self, obj):
+        if not obj.pk:
+            return "-"
+        return render_print_sheet_link(reverse("bundle_print_sheet", args=[obj.pk]))
+
+    print_sheet.short_description = "Label Sheet"
+
 
 @admin.register(MaterialPiece)
 class MaterialPieceAdmin(BaseModelAdmin):
+    keyset_pagination = True
     list_display = (
         "bundle",
         "qr_code",
@@ -241,7 +298,16 @@ class MaterialPieceAdmin(BaseModelAdmin):
         "created_at",
         "updated_at",
     )
-    list_filter = ("bundle", "current_production_line")
+    list_filter = (("bundle", AutocompleteFilter), "current_production_line")
+    list_filter_submit = True
+    list_select_related = (
+        "bundle__production_batch__order__style",
+        "bundle__material__material_type",
+        "bundle__material__color",
+        "bundle__size",
+        "bundle__color",
+        "current_production_line",
+    )
     readonly_fields = ["qr_code", "qr_image_display"]
     fields = ["bundle", "qr_code", "qr_image_display", "current_production_line"]
 
@@ -253,9 +319,21 @@ class MaterialPieceAdmin(BaseModelAdmin):
 
 @admin.register(ProductionBatch)
 class ProductionBatchAdmin(BaseModelAdmin):
-    list_display = ("order", "batch_number")
+    list_display = ("order", "batch_number", "print_sheet")
+    list_select_related = ("order__buyer", "order__season", "order__style")
+    search_fields = ("batch_number__startswith",)
     inlines = [BundleInline]
     filter_horizontal = ("production_lines",)
+    readonly_fields = ["print_sheet"]
+
+    def print_sheet(self, obj):
+        if not obj.pk:
+            return "-"
+        return render_print_sheet_link(
+            reverse("production_batch_print_sheet", args=[obj.pk])
+        )
+
+    print_sheet.short_description = "Label Sheet"
 
 
 @admin.register(ProductionLine)
@@ -272,18 +350,35 @@ class ScannerAdmin(BaseModelAdmin):
 
 @admin.register(ScanEvent)
 class ScanEventAdmin(BaseModelAdmin):
+    keyset_pagination = True
     list_display = ("scanner", "material_piece", "scan_time")
     list_filter = ("scanner", "scan_time")
     inlines = [QualityCheckInline]
+    actions = ["export_csv", "export_excel"]
+
+    def export_csv(self, request, queryset):
+        return scan_events_csv_response(queryset)
+
+    export_csv.short_description = "Export selected scan events to CSV"
+
+    def export_excel(self, request, queryset):
+        return scan_events_csv_response(queryset, excel=True)
+
+    export_excel.short_description = "Export selected scan events for Excel"
 
 
 @admin.register(QualityCheck)
 class QualityCheckAdmin(BaseModelAdmin):
+    keyset_pagination = True
     list_display = ("scan_event", "status", "defects_list", "created_at", "updated_at")
     list_filter = ("status", "defects")
+    list_select_related = ("scan_event",)
     filter_horizontal = ("defects",)
     inlines = [ReworkAssignmentInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("defects")
+
     def defects_list(self, obj):
         return ", ".join([defect.name for defect in obj.defects.all()])
 
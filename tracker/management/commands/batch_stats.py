@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from tracker.models import ProductionBatch
+from tracker.services.dashboard import get_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = "Prints the production line statistics of a production batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("batch_id", type=int, help="ID of the production batch")
+        parser.add_argument(
+            "--live",
+            action="store_true",
+            help="Compute the statistics from raw scan events instead of the rollups",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            production_batch = ProductionBatch.objects.get(pk=options["batch_id"])
+        except ProductionBatch.DoesNotExist:
+            raise CommandError(f"Production batch {options['batch_id']} not found.")
+
+        stats = get_dashboard_stats(production_batch, live=options["live"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Batch {production_batch.batch_number}: {stats['total_pieces']} pieces"
+            )
+        )
+        for item in stats["material_breakdown"]:
+            self.stdout.write(f"  {item['bundle__material__name']}: {item['count']}")
+
+        self.stdout.write(
+            f"{'Line':<20} {'IN':>6} {'OUT':>6} {'PEND':>6} "
+            f"{'OK':>6} {'REJ':>6} {'RWK':>6} {'EFF%':>7}"
+        )
+        for stat in stats["production_line_stats"]:
+            self.stdout.write(
+                f"{stat['line'].name:<20} {stat['input_pieces']:>6} "
+                f"{stat['output_pieces']:>6} {stat['shortage_liability']:>6} "
+                f"{stat['accepted_count']:>6} {stat['rejected_count']:>6} "
+                f"{stat['rework_count']:>6} {stat['efficiency']:>7.1f}"
+            )
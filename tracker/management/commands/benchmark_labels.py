@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from tracker.models import Bundle, MaterialPiece
+from tracker.services.labels import BUNDLE_LABEL_RELATED_FIELDS, LabelContext
+from tracker.services.rendering import render_label_file
+
+
+class Command(BaseCommand):
+    help = "Measures QR label rendering and encoding throughput in labels per second"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count", type=int, default=1000, help="Number of labels to render"
+        )
+        parser.add_argument(
+            "--bundle",
+            type=int,
+            default=None,
+            help="ID of the bundle whose piece labels are rendered (defaults to the first)",
+        )
+
+    def handle(self, *args, **options):
+        bundles = Bundle.objects.select_related(
+            "material__material_type", *BUNDLE_LABEL_RELATED_FIELDS
+        ).order_by("id")
+        if options["bundle"]:
+            bundles = bundles.filter(pk=options["bundle"])
+        bundle = bundles.first()
+        if bundle is None:
+            raise CommandError("No bundle found to render labels for.")
+
+        context = LabelContext.for_material_pieces(bundle)
+        field = MaterialPiece._meta.get_field("qr_image")
+        count = options["count"]
+
+        started = time.monotonic()
+        total_bytes = 0
+        for index in range(count):
+            label = render_label_file((f"1{index:07d}", context, field))
+            total_bytes += label.size
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{count} labels in {elapsed:.2f}s: {count / elapsed:.1f} labels/s, "
+                f"{total_bytes / count / 1024:.1f} KiB per label."
+            )
+        )
@@ -0,0 +1,51 @@
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from tracker.services.event_log import (
+    EVENT_LOG_CHUNK_SIZE,
+    EventLogLocked,
+    export_event_log,
+)
+
+
+class Command(BaseCommand):
+    help = "Appends new scan events to the partitioned Parquet event log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-dir",
+            default=settings.EVENT_LOG_EXPORT_DIR,
+            help="Root directory of the event log (defaults to EVENT_LOG_EXPORT_DIR)",
+        )
+        parser.add_argument(
+            "--after-id",
+            type=int,
+            default=None,
+            help="Export events after this id instead of the last exported one",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EVENT_LOG_CHUNK_SIZE,
+            help="Number of events read and written at a time",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            exported, last_event_id = export_event_log(
+                options["output_dir"],
+                after_id=options["after_id"],
+                chunk_size=options["chunk_size"],
+            )
+        except (ImproperlyConfigured, EventLogLocked) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{exported} scan events exported in {elapsed:.1f}s "
+                f"(last event id {last_event_id})."
+            )
+        )
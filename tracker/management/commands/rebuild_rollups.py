@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from tracker.models import ProductionBatch
+from tracker.services.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the production line rollups from the raw scan events"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch",
+            type=int,
+            action="append",
+            dest="batch_ids",
+            help="ID of a production batch to rebuild (defaults to all batches)",
+        )
+
+    def handle(self, *args, **options):
+        production_batches = ProductionBatch.objects.order_by("id")
+        if options["batch_ids"]:
+            production_batches = production_batches.filter(id__in=options["batch_ids"])
+
+        for production_batch in production_batches.iterator():
+            rollups = rebuild_rollups(production_batch)
+            self.stdout.write(
+                f"Batch {production_batch.batch_number}: {len(rollups)} line rollups rebuilt."
+            )
+
+        self.stdout.write(self.style.SUCCESS("Rollups rebuilt successfully."))
@@ -0,0 +1,78 @@
+import time
+from django.core.management.base import BaseCommand
+from tracker.models import QRRenderJob
+from tracker.services.rendering import (
+    create_missing_qr_variants,
+    drain_qr_render_queue,
+    enqueue_missing_qr_renders,
+    requeue_qr_render_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = "Renders the QR label images of all queued material pieces and bundles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of render processes (defaults to the number of CPU cores)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of jobs claimed at a time",
+        )
+        parser.add_argument(
+            "--enqueue-missing",
+            action="store_true",
+            help="Queue every material piece and bundle that has no QR image yet",
+        )
+        parser.add_argument(
+            "--create-variants",
+            action="store_true",
+            help="Generate the missing thumbnails of already rendered QR images",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Queue failed jobs again before rendering",
+        )
+        parser.add_argument(
+            "--requeue-processing",
+            action="store_true",
+            help="Queue jobs left in processing by a crashed worker again",
+        )
+
+    def handle(self, *args, **options):
+        if options["enqueue_missing"]:
+            pieces, bundles = enqueue_missing_qr_renders()
+            self.stdout.write(f"{pieces} material pieces and {bundles} bundles queued.")
+
+        if options["create_variants"]:
+            created = create_missing_qr_variants()
+            self.stdout.write(f"{created} QR image variants created.")
+
+        statuses = []
+        if options["retry_failed"]:
+            statuses.append(QRRenderJob.JobStatus.FAILED)
+        if options["requeue_processing"]:
+            statuses.append(QRRenderJob.JobStatus.PROCESSING)
+        if statuses:
+            requeued = requeue_qr_render_jobs(statuses)
+            self.stdout.write(f"{requeued} jobs queued again.")
+
+        started = time.monotonic()
+        rendered = drain_qr_render_queue(
+            workers=options["workers"], batch_size=options["batch_size"]
+        )
+        elapsed = time.monotonic() - started
+
+        rate = rendered / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{rendered} QR labels rendered in {elapsed:.1f}s ({rate:.1f} labels/s)."
+            )
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductionLineRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("input_pieces", models.IntegerField(default=0)),
+                ("output_pieces", models.IntegerField(default=0)),
+                ("accepted_count", models.IntegerField(default=0)),
+                ("rejected_count", models.IntegerField(default=0)),
+                ("rework_count", models.IntegerField(default=0)),
+                ("last_scan_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "production_batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="line_rollups",
+                        to="tracker.productionbatch",
+                    ),
+                ),
+                (
+                    "production_line",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="batch_rollups",
+                        to="tracker.productionline",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("production_batch", "production_line")},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_scan_events(apps, schema_editor):
+    """Keeps only the first scan event of each (scanner, material piece) pair"""
+    ScanEvent = apps.get_model("tracker", "ScanEvent")
+    first_ids = (
+        ScanEvent.objects.values("scanner_id", "material_piece_id")
+        .annotate(first_id=Min("id"))
+        .values("first_id")
+    )
+    duplicates = ScanEvent.objects.exclude(id__in=first_ids)
+    duplicates.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0003_scansubmission"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_scan_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="scanevent",
+            index=models.Index(
+                fields=["material_piece", "scan_time"], name="scanevent_piece_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanevent",
+            index=models.Index(
+                fields=["scanner", "scan_time"], name="scanevent_scanner_time_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="scanevent",
+            constraint=models.UniqueConstraint(
+                fields=("scanner", "material_piece"),
+                name="unique_scan_per_scanner_piece",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+def populate_qr_numbers(apps, schema_editor):
+    """Copies numeric QR codes into the integer qr_number column"""
+    for model_name in ("Bundle", "MaterialPiece"):
+        model = apps.get_model("tracker", model_name)
+        objects = []
+        for obj in model.objects.exclude(qr_code__isnull=True).only("id", "qr_code"):
+            if obj.qr_code.isdigit() and not obj.qr_code.startswith("0"):
+                obj.qr_number = int(obj.qr_code)
+                objects.append(obj)
+        model.objects.bulk_update(objects, ["qr_number"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0004_scanevent_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bundle",
+            name="qr_number",
+            field=models.PositiveBigIntegerField(
+                blank=True, editable=False, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialpiece",
+            name="qr_number",
+            field=models.PositiveBigIntegerField(
+                blank=True, editable=False, null=True, unique=True
+            ),
+        ),
+        migrations.RunPython(populate_qr_numbers, migrations.RunPython.noop),
+    ]
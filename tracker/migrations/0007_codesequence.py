@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:33
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_code_sequences(apps, schema_editor):
+    """Starts each code sequence after the largest code already in use"""
+    CodeSequence = apps.get_model("tracker", "CodeSequence")
+    for prefix, model_name in (("1", "MaterialPiece"), ("2", "Bundle")):
+        model = apps.get_model("tracker", model_name)
+        largest = model.objects.aggregate(largest=Max("qr_number"))["largest"]
+        next_value = int(str(largest)[1:]) + 1 if largest else 1
+        CodeSequence.objects.create(prefix=prefix, next_value=next_value)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0006_qrrenderjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodeSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", models.CharField(max_length=1, unique=True)),
+                ("next_value", models.PositiveBigIntegerField(default=1)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_code_sequences, migrations.RunPython.noop),
+    ]
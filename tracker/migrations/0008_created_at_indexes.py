@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0007_codesequence"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="materialpiece",
+            index=models.Index(
+                fields=["created_at", "id"], name="materialpiece_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="qualitycheck",
+            index=models.Index(
+                fields=["created_at", "id"], name="qualitycheck_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanevent",
+            index=models.Index(
+                fields=["created_at", "id"], name="scanevent_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0008_created_at_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="material",
+            name="name",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="productionbatch",
+            name="batch_number",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=100, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="style",
+            name="name",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
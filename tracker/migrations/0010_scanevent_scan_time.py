@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0009_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scanevent",
+            name="scan_time",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracker", "0010_scanevent_scan_time"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="materialpiece",
+            name="materialpiece_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="qualitycheck",
+            name="qualitycheck_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="scanevent",
+            name="scanevent_created_idx",
+        ),
+    ]
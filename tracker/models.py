@@ -1,8 +1,12 @@
 from django.db import models
+from django.utils import timezone
 from common.models import BaseModel
 from common.fields import OptimizedImageField
 from tracker.utils import material_qr_image_upload_path
 
+# Small previews for admin lists, generated when the image is saved
+QR_IMAGE_VARIANTS = {"thumbnail": {"max_dimensions": (200, 200), "preset": "graphics"}}
+
 
 class Buyer(BaseModel):
     name = models.CharField(max_length=100, unique=True)
@@ -33,7 +37,7 @@ class Color(BaseModel):
 
 
 class Style(BaseModel):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
 
     def __str__(self):
         return f"{self.name}"
@@ -72,7 +76,7 @@ class MaterialType(BaseModel):
 
 
 class Material(BaseModel):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     material_type = models.ForeignKey(
         MaterialType, on_delete=models.CASCADE, related_name="materials"
     )
@@ -127,7 +131,9 @@ class ProductionBatch(BaseModel):
     production_lines = models.ManyToManyField(
         ProductionLine, related_name="production_batches", blank=True
     )
-    batch_number = models.CharField(max_length=100, blank=True, null=True)
+    batch_number = models.CharField(
+        max_length=100, blank=True, null=True, db_index=True
+    )
 
     def __str__(self):
         return f"{self.order.style.name} - Batch {self.batch_number}"
@@ -148,8 +154,16 @@ class Bundle(BaseModel):
     )
     quantity = models.PositiveIntegerField(default=1)
     qr_code = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    qr_number = models.PositiveBigIntegerField(
+        unique=True, blank=True, null=True, editable=False
+    )
     qr_image = OptimizedImageField(
-        upload_to="bundle_qr_codes/", blank=True, null=True, max_dimensions=(400, 400)
+        upload_to="bundle_qr_codes/",
+        blank=True,
+        null=True,
+        max_dimensions=(400, 400),
+        preset="graphics",
+        variants=QR_IMAGE_VARIANTS,
     )
 
     def __str__(self):
@@ -161,11 +175,16 @@ class MaterialPiece(BaseModel):
         Bundle, on_delete=models.CASCADE, related_name="material_pieces"
     )
     qr_code = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    qr_number = models.PositiveBigIntegerField(
+        unique=True, blank=True, null=True, editable=False
+    )
     qr_image = OptimizedImageField(
         upload_to=material_qr_image_upload_path,
         blank=True,
         null=True,
         max_dimensions=(400, 400),
+        preset="graphics",
+        variants=QR_IMAGE_VARIANTS,
     )
     current_production_line = models.ForeignKey(
         "ProductionLine",
@@ -267,11 +286,29 @@ class ScanEvent(BaseModel):
         on_delete=models.CASCADE,
         related_name="scan_events",
     )
-    scan_time = models.DateTimeField(auto_now_add=True)
+    scan_time = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         return f"Scan Event - {self.scan_time}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scanner", "material_piece"],
+                name="unique_scan_per_scanner_piece",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["material_piece", "scan_time"],
+                name="scanevent_piece_time_idx",
+            ),
+            models.Index(
+                fields=["scanner", "scan_time"],
+                name="scanevent_scanner_time_idx",
+            ),
+        ]
+
 
 class ProductionTarget(BaseModel):
     production_line = models.ForeignKey(
@@ -289,3 +326,88 @@ class ProductionTarget(BaseModel):
 
     class Meta:
         unique_together = ("production_line", "style", "date")
+
+
+class ProductionLineRollup(models.Model):
+    production_batch = models.ForeignKey(
+        ProductionBatch, on_delete=models.CASCADE, related_name="line_rollups"
+    )
+    production_line = models.ForeignKey(
+        ProductionLine, on_delete=models.CASCADE, related_name="batch_rollups"
+    )
+    input_pieces = models.IntegerField(default=0)
+    output_pieces = models.IntegerField(default=0)
+    accepted_count = models.IntegerField(default=0)
+    rejected_count = models.IntegerField(default=0)
+    rework_count = models.IntegerField(default=0)
+    last_scan_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.production_line} - Batch {self.production_batch_id}"
+
+    class Meta:
+        unique_together = ("production_batch", "production_line")
+
+
+class ScanSubmission(models.Model):
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    scanner = models.ForeignKey(
+        Scanner,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="submissions",
+    )
+    response = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.idempotency_key
+
+
+class QRRenderJob(models.Model):
+    class JobStatus(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        PROCESSING = "PROCESSING", "Processing"
+        RENDERED = "RENDERED", "Rendered"
+        FAILED = "FAILED", "Failed"
+
+    material_piece = models.OneToOneField(
+        MaterialPiece,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="qr_render_job",
+    )
+    bundle = models.OneToOneField(
+        Bundle,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="qr_render_job",
+    )
+    status = models.CharField(
+        max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        if self.material_piece_id:
+            return f"QR Render - Piece {self.material_piece_id} - {self.status}"
+        return f"QR Render - Bundle {self.bundle_id} - {self.status}"
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"], name="qrrenderjob_status_idx")]
+
+
+class CodeSequence(models.Model):
+    prefix = models.CharField(max_length=1, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Code sequence {self.prefix} - next {self.next_value}"
@@ -0,0 +1,59 @@
+from django.db import transaction
+from tracker.models import CodeSequence
+
+
+# --- QR CODE ALLOCATION ---
+
+MATERIAL_PIECE_PREFIX = "1"
+BUNDLE_PREFIX = "2"
+CODE_DIGITS = 7
+
+
+def format_qr_code(prefix, value):
+    """
+    Formats a sequence value as a numeric code: the prefix followed by the
+    value padded to 7 digits. Larger values extend the code instead of being
+    truncated, so codes never collide.
+    """
+    return f"{prefix}{str(value).zfill(CODE_DIGITS)}"
+
+
+def get_qr_number(qr_code):
+    """
+    Returns the integer form of a numeric QR code, or None for other codes.
+    Codes with a leading zero have none, as the integer would also match the
+    code without it.
+    """
+    if (
+        isinstance(qr_code, str)
+        and qr_code.isascii()
+        and qr_code.isdigit()
+        and not qr_code.startswith("0")
+    ):
+        return int(qr_code)
+    return None
+
+
+@transaction.atomic
+def reserve_codes(prefix, count):
+    """
+    Reserves a contiguous block of codes for a prefix and returns them.
+
+    The sequence row stays locked until the surrounding transaction ends, so
+    concurrent reservations get disjoint blocks.
+    """
+    sequence, _ = CodeSequence.objects.select_for_update().get_or_create(prefix=prefix)
+    start = sequence.next_value
+    sequence.next_value = start + count
+    sequence.save(update_fields=["next_value", "updated_at"])
+    return [format_qr_code(prefix, value) for value in range(start, start + count)]
+
+
+def assign_qr_codes(instances, prefix):
+    """Assigns reserved codes to unsaved or code-less instances in place"""
+    instances = list(instances)
+    if not instances:
+        return
+    for instance, qr_code in zip(instances, reserve_codes(prefix, len(instances))):
+        instance.qr_code = qr_code
+        instance.qr_number = get_qr_number(qr_code)
@@ -0,0 +1,195 @@
+from collections import defaultdict
+from django.db.models import Count, Max, Min, Q
+from tracker.models import (
+    MaterialPiece,
+    ProductionLine,
+    ProductionLineRollup,
+    QualityCheck,
+    ScanEvent,
+    Scanner,
+)
+
+
+# --- LINE TOTALS ---
+
+COUNTER_FIELDS = (
+    "input_pieces",
+    "output_pieces",
+    "accepted_count",
+    "rejected_count",
+    "rework_count",
+)
+
+
+def _empty_totals():
+    return dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+def compute_line_totals(production_batch, piece_ids=None):
+    """
+    Computes the raw per-line counters for a production batch in two grouped queries.
+
+    Every counter is a sum over pieces, so passing `piece_ids` restricts the
+    result to the contribution of those pieces only.
+
+    Returns a dict of {production_line_id: {counter: value}}.
+    """
+    events = ScanEvent.objects.filter(
+        material_piece__bundle__production_batch=production_batch
+    )
+    if piece_ids is not None:
+        events = events.filter(material_piece_id__in=piece_ids)
+
+    totals = defaultdict(_empty_totals)
+
+    # One row per (piece, line) the piece was scanned at
+    piece_line_rows = (
+        events.values("material_piece_id", "scanner__production_line_id")
+        .annotate(
+            first_scan=Min("scan_time"),
+            last_scan=Max("scan_time"),
+            in_scans=Count("id", filter=Q(scanner__type=Scanner.ScannerType.IN)),
+            closing_scans=Count(
+                "id",
+                filter=Q(
+                    scanner__type__in=[
+                        Scanner.ScannerType.OUT,
+                        Scanner.ScannerType.QC,
+                    ]
+                ),
+            ),
+        )
+        .order_by()
+    )
+
+    visits_by_piece = defaultdict(list)
+    for row in piece_line_rows:
+        visits_by_piece[row["material_piece_id"]].append(row)
+
+    for visits in visits_by_piece.values():
+        for visit in visits:
+            line_id = visit["scanner__production_line_id"]
+            if line_id is None or not visit["in_scans"]:
+                continue
+
+            line_totals = totals[line_id]
+            line_totals["input_pieces"] += 1
+
+            # Output priority: OUT or QC scan at this line, otherwise any later
+            # scan of the same piece at another line
+            if visit["closing_scans"] or any(
+                other["scanner__production_line_id"] != line_id
+                and other["last_scan"] > visit["first_scan"]
+                for other in visits
+            ):
+                line_totals["output_pieces"] += 1
+
+    # QC status counts per line
+    qc_rows = (
+        events.filter(scanner__type=Scanner.ScannerType.QC)
+        .values("scanner__production_line_id")
+        .annotate(
+            accepted_count=Count(
+                "quality_check",
+                filter=Q(quality_check__status=QualityCheck.QualityStatus.ACCEPTED),
+            ),
+            rejected_count=Count(
+                "quality_check",
+                filter=Q(quality_check__status=QualityCheck.QualityStatus.REJECTED),
+            ),
+            rework_count=Count(
+                "quality_check",
+                filter=Q(quality_check__status=QualityCheck.QualityStatus.REWORK),
+            ),
+        )
+        .order_by()
+    )
+
+    for row in qc_rows:
+        line_id = row["scanner__production_line_id"]
+        if line_id is None:
+            continue
+        for field in ("accepted_count", "rejected_count", "rework_count"):
+            totals[line_id][field] += row[field]
+
+    return dict(totals)
+
+
+def get_rollup_totals(production_batch):
+    """Reads the per-line counters of a batch from the stored rollups"""
+    rows = ProductionLineRollup.objects.filter(
+        production_batch=production_batch
+    ).values("production_line_id", *COUNTER_FIELDS)
+    return {row.pop("production_line_id"): row for row in rows}
+
+
+# --- DASHBOARD STATS ---
+
+
+def build_line_stats(line, totals):
+    """Derives shortage and efficiency for a line from its raw counters"""
+    input_pieces = totals["input_pieces"]
+    output_pieces = totals["output_pieces"]
+
+    # Rejected pieces contribute 0% to efficiency (complete loss)
+    # Rework pieces contribute 50% to efficiency (partial completion)
+    efficiency = 0
+    if input_pieces > 0:
+        effective_output = totals["accepted_count"] + (totals["rework_count"] * 0.5)
+        efficiency = (effective_output / input_pieces) * 100
+
+    return {
+        "line": line,
+        "input_pieces": input_pieces,
+        "output_pieces": output_pieces,
+        "shortage_liability": input_pieces - output_pieces,
+        "efficiency": efficiency,
+        "accepted_count": totals["accepted_count"],
+        "rejected_count": totals["rejected_count"],
+        "rework_count": totals["rework_count"],
+    }
+
+
+def get_production_line_stats(production_batch, production_lines=None, live=False):
+    """
+    Returns the dashboard statistics of every production line for a batch.
+
+    Reads the stored rollups unless `live` is set, in which case the counters
+    are computed from the raw scan events. Batches without any rollups yet,
+    e.g. scanned before rollups existed, are also computed live.
+    """
+    if production_lines is None:
+        production_lines = ProductionLine.objects.all().order_by("id")
+
+    totals = None if live else get_rollup_totals(production_batch)
+    if not totals:
+        totals = compute_line_totals(production_batch)
+    return [
+        build_line_stats(line, totals.get(line.id, _empty_totals()))
+        for line in production_lines
+    ]
+
+
+def get_batch_summary(production_batch):
+    """Returns the total piece count and material breakdown for a batch"""
+    batch_pieces = MaterialPiece.objects.filter(
+        bundle__production_batch=production_batch
+    )
+    material_breakdown = list(
+        batch_pieces.values("bundle__material__name")
+        .annotate(count=Count("id"))
+        .order_by("-count")
+    )
+    return {
+        "total_pieces": sum(item["count"] for item in material_breakdown),
+        "material_breakdown": material_breakdown,
+    }
+
+
+def get_dashboard_stats(production_batch, live=False):
+    """Returns all dashboard statistics for a production batch"""
+    summary = get_batch_summary(production_batch)
+    return {
+        **summary,
+        "production_line_stats": get_production_line_stats(production_batch, live=live),
+    }
@@ -0,0 +1,256 @@
+import io
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.utils import timezone
+from tracker.models import ScanEvent
+from tracker.services.exports import iter_scan_event_chunks
+
+try:
+    import fcntl
+except ImportError:  # Windows, where overlapping runs are not guarded
+    fcntl = None
+
+EVENT_LOG_CHUNK_SIZE = 20000
+EVENT_LOG_STATE_FILE = "_export_state.json"
+EVENT_LOG_LOCK_FILE = ".export.lock"
+
+# Ids this close below the last exported one that were missing are read
+# again by the next runs, so rows from transactions that commit out of id
+# order are not skipped
+EVENT_LOG_GAP_WINDOW = 10000
+
+
+def get_pyarrow():
+    """Imports pyarrow, which is only needed for the columnar exports"""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            "Columnar event log exports require pyarrow (pip install pyarrow)."
+        ) from e
+    return pyarrow
+
+
+# --- RECORD BATCHES ---
+
+
+def get_event_log_schema(pa):
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("event_id", pa.int64()),
+            ("scan_time", pa.timestamp("us", tz="UTC")),
+            ("scanner", labels),
+            ("scanner_type", labels),
+            ("production_line", labels),
+            ("piece_qr_code", pa.string()),
+            ("bundle_qr_code", pa.string()),
+            ("batch_id", pa.int64()),
+            ("batch_number", labels),
+            ("qc_status", labels),
+            ("defects", pa.list_(labels)),
+        ]
+    )
+
+
+def build_event_log_batch(pa, schema, rows):
+    """Builds a record batch from rows yielded by iter_scan_event_chunks"""
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+        elif pa.types.is_list(field.type):
+            names = pa.array(values, type=pa.list_(pa.string()))
+            array = pa.ListArray.from_arrays(
+                names.offsets, names.flatten().dictionary_encode()
+            )
+        else:
+            array = pa.array(values, type=field.type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_event_log_batches(queryset, chunk_size=EVENT_LOG_CHUNK_SIZE):
+    pa = get_pyarrow()
+    schema = get_event_log_schema(pa)
+    for rows in iter_scan_event_chunks(queryset, chunk_size):
+        yield build_event_log_batch(pa, schema, rows)
+
+
+# --- ARROW IPC STREAM ---
+
+
+def stream_event_log_ipc(queryset, chunk_size=EVENT_LOG_CHUNK_SIZE):
+    """
+    Yields an Arrow IPC stream of the event log, one record batch per chunk.
+
+    Readers get it with ``pyarrow.ipc.open_stream``; dictionaries are resent
+    with every batch.
+    """
+    pa = get_pyarrow()
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, get_event_log_schema(pa))
+
+    def flush():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield flush()
+    for batch in iter_event_log_batches(queryset, chunk_size):
+        writer.write_batch(batch)
+        yield flush()
+    writer.close()
+    yield flush()
+
+
+# --- PARQUET PARTITIONS ---
+
+
+def read_export_state(output_dir):
+    path = Path(output_dir) / EVENT_LOG_STATE_FILE
+    if not path.exists():
+        return {"last_event_id": 0, "pending_event_ids": []}
+    state = json.loads(path.read_text())
+    state.setdefault("pending_event_ids", [])
+    return state
+
+
+def write_export_state(output_dir, state):
+    path = Path(output_dir) / EVENT_LOG_STATE_FILE
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(state, indent=2))
+    os.replace(temp_path, path)
+
+
+class EventLogLocked(RuntimeError):
+    """Another export into the same event log directory is running"""
+
+
+@contextmanager
+def lock_event_log(output_dir):
+    """
+    Holds an exclusive lock on an event log directory for one export run.
+
+    The lock is released by the OS when the process exits, so a crashed run
+    never blocks the next one.
+    """
+    with open(Path(output_dir) / EVENT_LOG_LOCK_FILE, "a") as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError as e:
+                raise EventLogLocked(
+                    f"Another event log export into {output_dir} is running."
+                ) from e
+        yield
+
+
+def get_partition_dir(output_dir, scan_date, batch_id):
+    return Path(output_dir) / f"scan_date={scan_date:%Y-%m-%d}" / f"batch_id={batch_id}"
+
+
+def export_event_log(output_dir, after_id=None, chunk_size=EVENT_LOG_CHUNK_SIZE):
+    """
+    Appends scan events newer than the last export as Parquet files.
+
+    Files are partitioned Hive-style by local scan date and batch, so
+    ``pyarrow.dataset`` and pandas read the directory as one table. Each run
+    writes one file per partition named after its first event id, and the
+    last exported id is recorded only after every file has been closed, so
+    a failed run is simply redone by the next one.
+
+    Ids missing below the last exported one may belong to transactions that
+    had not committed yet. The last EVENT_LOG_GAP_WINDOW of them are
+    recorded and read again by later runs, so every event is exported once.
+
+    Runs into the same directory are serialized with a file lock; an
+    overlapping run raises EventLogLocked instead of rewriting the same files.
+
+    Returns (exported event count, last exported event id).
+    """
+    pa = get_pyarrow()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with lock_event_log(output_dir):
+        return _export_event_log(pa, output_dir, after_id, chunk_size)
+
+
+def _export_event_log(pa, output_dir, after_id, chunk_size):
+    state = read_export_state(output_dir)
+    pending_ids = []
+    if after_id is None:
+        after_id = state["last_event_id"]
+        pending_ids = state["pending_event_ids"]
+
+    queryset = ScanEvent.objects.filter(Q(id__gt=after_id) | Q(id__in=pending_ids))
+    schema = get_event_log_schema(pa)
+    batch_index = schema.get_field_index("batch_id")
+    file_schema = schema.remove(batch_index)
+
+    writers = {}
+    file_name = None
+    exported = 0
+    last_event_id = after_id
+    exported_pending_ids = set()
+    gaps = []
+    try:
+        for batch in iter_event_log_batches(queryset, chunk_size):
+            event_ids = batch.column("event_id").to_pylist()
+            if file_name is None:
+                file_name = f"part-{event_ids[0]:012d}.parquet"
+            for event_id in event_ids:
+                if event_id <= after_id:
+                    exported_pending_ids.add(event_id)
+                    continue
+                if event_id > last_event_id + 1:
+                    gaps.append((last_event_id + 1, event_id))
+                last_event_id = event_id
+
+            partitions = {}
+            scan_times = batch.column("scan_time").to_pylist()
+            batch_ids = batch.column("batch_id").to_pylist()
+            for index, (scan_time, batch_id) in enumerate(zip(scan_times, batch_ids)):
+                key = (timezone.localdate(scan_time), batch_id)
+                partitions.setdefault(key, []).append(index)
+
+            batch = batch.remove_column(batch_index)
+            for key, indices in partitions.items():
+                partition_dir = get_partition_dir(output_dir, *key)
+                writer = writers.get(partition_dir)
+                if writer is None:
+                    partition_dir.mkdir(parents=True, exist_ok=True)
+                    writer = pa.parquet.ParquetWriter(
+                        partition_dir / file_name, file_schema, compression="zstd"
+                    )
+                    writers[partition_dir] = writer
+                writer.write_batch(batch.take(indices))
+
+            exported += batch.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Keep looking for the missing ids close below the last exported one
+    lowest_pending_id = last_event_id - EVENT_LOG_GAP_WINDOW
+    pending_event_ids = [
+        event_id
+        for event_id in pending_ids
+        if event_id not in exported_pending_ids and event_id > lowest_pending_id
+    ]
+    for start, end in gaps:
+        pending_event_ids.extend(range(max(start, lowest_pending_id + 1), end))
+
+    if exported or pending_event_ids != pending_ids:
+        write_export_state(
+            output_dir,
+            {"last_event_id": last_event_id, "pending_event_ids": pending_event_ids},
+        )
+    return exported, last_event_id
@@ -0,0 +1,162 @@
+import csv
+from datetime import datetime, time, timedelta
+from itertools import islice
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from tracker.models import QualityCheck, ScanEvent
+
+EXPORT_CHUNK_SIZE = 2000
+EXCEL_BOM = "\ufeff"
+# Leading characters that make Excel evaluate a cell as a formula
+EXCEL_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+SCAN_EVENT_EXPORT_FIELDS = (
+    ("id", "Event ID"),
+    ("scan_time", "Scan Time"),
+    ("scanner__name", "Scanner"),
+    ("scanner__type", "Scanner Type"),
+    ("scanner__production_line__name", "Production Line"),
+    ("material_piece__qr_code", "Piece QR Code"),
+    ("material_piece__bundle__qr_code", "Bundle QR Code"),
+    ("material_piece__bundle__production_batch_id", "Batch ID"),
+    ("material_piece__bundle__production_batch__batch_number", "Batch Number"),
+    ("quality_check__status", "QC Status"),
+)
+SCAN_EVENT_EXPORT_HEADER = [label for _, label in SCAN_EVENT_EXPORT_FIELDS] + [
+    "Defects"
+]
+
+
+# --- FILTERS ---
+
+
+def parse_export_bound(value, end=False):
+    """
+    Parses a date or datetime query value into an aware datetime.
+
+    A bare date used as an end bound covers the whole day.
+    """
+    if not value:
+        return None
+
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_scan_events(
+    queryset=None, batch_id=None, line_id=None, start=None, end=None
+):
+    """Narrows scan events by production batch, scanner line and [start, end)"""
+    if queryset is None:
+        queryset = ScanEvent.objects.all()
+    if batch_id:
+        queryset = queryset.filter(material_piece__bundle__production_batch_id=batch_id)
+    if line_id:
+        queryset = queryset.filter(scanner__production_line_id=line_id)
+    if start:
+        queryset = queryset.filter(scan_time__gte=start)
+    if end:
+        queryset = queryset.filter(scan_time__lt=end)
+    return queryset
+
+
+# --- ROWS ---
+
+
+def _get_defect_names(quality_check_ids):
+    defects = {}
+    rows = (
+        QualityCheck.defects.through.objects.filter(
+            qualitycheck_id__in=quality_check_ids
+        )
+        .order_by("defect__name")
+        .values_list("qualitycheck_id", "defect__name")
+    )
+    for quality_check_id, name in rows:
+        defects.setdefault(quality_check_id, []).append(name)
+    return defects
+
+
+def iter_scan_event_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields lists of flat scan event rows, reading from a server-side cursor.
+
+    Each row ends with the list of its defect names; defects are looked up
+    once per chunk for the quality checks it contains.
+    """
+    rows = (
+        queryset.order_by("id")
+        .values_list(
+            *[field for field, _ in SCAN_EVENT_EXPORT_FIELDS], "quality_check__id"
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    while chunk := list(islice(rows, chunk_size)):
+        defects = _get_defect_names([row[-1] for row in chunk if row[-1]])
+        yield [
+            [*values, defects.get(quality_check_id, [])]
+            for *values, quality_check_id in chunk
+        ]
+
+
+def iter_scan_event_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields one flat row per scan event with its defect names joined"""
+    for chunk in iter_scan_event_chunks(queryset, chunk_size):
+        for *values, defects in chunk:
+            yield [*values, "; ".join(defects)]
+
+
+# --- CSV ---
+
+
+def escape_excel_formula(value):
+    """Prefixes text Excel would run as a formula so it is shown as text"""
+    if isinstance(value, str) and value.startswith(EXCEL_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class _Echo:
+    """File-like object that hands each written line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def stream_scan_events_csv(queryset, excel=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields CSV lines for the scan events of a queryset.
+
+    With ``excel`` a UTF-8 byte order mark is sent first so Excel picks the
+    right encoding when the file is opened directly, and text that Excel
+    would evaluate as a formula is escaped.
+    """
+    writer = csv.writer(_Echo())
+    if excel:
+        yield EXCEL_BOM
+    yield writer.writerow(SCAN_EVENT_EXPORT_HEADER)
+    for row in iter_scan_event_rows(queryset, chunk_size):
+        if row[1] is not None:
+            row[1] = timezone.localtime(row[1]).isoformat()
+        if excel:
+            row = [escape_excel_formula(value) for value in row]
+        yield writer.writerow(row)
+
+
+def scan_events_csv_response(queryset, excel=False):
+    response = StreamingHttpResponse(
+        stream_scan_events_csv(queryset, excel=excel),
+        content_type="text/csv; charset=utf-8",
+    )
+    filename = f"scan-events-{timezone.localdate():%Y%m%d}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,247 @@
+import qrcode
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from threading import Lock
+from xml.sax.saxutils import escape
+from PIL import Image, ImageDraw, ImageFont
+
+
+# --- LABEL CONTEXT ---
+
+
+@dataclass(frozen=True)
+class LabelContext:
+    """
+    Everything printed on a label besides the code, built once from
+    prefetched objects and shared by all labels of a bundle.
+    """
+
+    lines: tuple
+    label_width: int
+
+    @classmethod
+    def for_material_pieces(cls, bundle):
+        """Context of the material piece labels of a bundle"""
+        order = bundle.production_batch.order
+        return cls(
+            lines=(
+                f"Buyer: {order.buyer.name}",
+                f"Season: {order.season.name}",
+                f"Style: {order.style.name}",
+                f"Size: {bundle.size.name if bundle.size else 'N/A'}",
+                f"Color: {bundle.color.name if bundle.color else 'N/A'}",
+                f"Batch: {bundle.production_batch.batch_number or 'N/A'}",
+                f"Material Type: {bundle.material.material_type.name}",
+                f"Material Name: {bundle.material.name}",
+            ),
+            label_width=300,
+        )
+
+    @classmethod
+    def for_bundle(cls, bundle):
+        """Context of the label of a bundle itself"""
+        order = bundle.production_batch.order
+        return cls(
+            lines=(
+                f"Buyer: {order.buyer.name}",
+                f"Season: {order.season.name}",
+                f"Style: {order.style.name}",
+                f"Size: {bundle.size.name if bundle.size else 'N/A'}",
+                f"Color: {bundle.color.name if bundle.color else 'N/A'}",
+                f"Batch: {bundle.production_batch.batch_number or 'N/A'}",
+                f"Bundle ID: {bundle.id}",
+            ),
+            label_width=250,
+        )
+
+
+# Related fields needed to build label contexts without lazy loads
+MATERIAL_LABEL_RELATED_FIELDS = (
+    "bundle__production_batch__order__buyer",
+    "bundle__production_batch__order__season",
+    "bundle__production_batch__order__style",
+    "bundle__material__material_type",
+    "bundle__size",
+    "bundle__color",
+)
+BUNDLE_LABEL_RELATED_FIELDS = (
+    "production_batch__order__buyer",
+    "production_batch__order__season",
+    "production_batch__order__style",
+    "size",
+    "color",
+)
+
+
+# --- LABEL RENDERER ---
+
+LABEL_CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+@lru_cache(maxsize=None)
+def get_label_font(size):
+    """Loads a label font once per process"""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        return ImageFont.load_default()  # If Arial is not available
+
+
+class LabelRenderer:
+    """
+    Renders QR labels: text on the left, the QR code and its numeric code on
+    the right.
+
+    The text part of a label only depends on its context, so it is drawn once
+    per context and kept in a bounded cache of prerendered backgrounds. Each
+    label then only costs the QR matrix, one paste and the code text.
+    """
+
+    FONT_SIZE = 18
+    BOX_SIZE = 10
+    BORDER = 4
+    TEXT_OFFSET = (30, 40)
+    LINE_HEIGHT = 25
+    CODE_AREA_HEIGHT = 30
+    DEFAULT_CACHE_SIZE = 256
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._backgrounds = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def font(self):
+        return get_label_font(self.FONT_SIZE)
+
+    def get_qr_matrix(self, numeric_code):
+        """Returns the module matrix of a QR code, border included"""
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            border=self.BORDER,
+        )
+        qr.add_data(numeric_code)
+        qr.make(fit=True)
+        return qr.get_matrix()
+
+    def render_qr_matrix(self, numeric_code):
+        """Draws the QR code by scaling its module matrix up to the box size"""
+        matrix = self.get_qr_matrix(numeric_code)
+        modules = len(matrix)
+        qr_img = Image.frombytes(
+            "L",
+            (modules, modules),
+            bytes(0 if cell else 255 for row in matrix for cell in row),
+        )
+        size = modules * self.BOX_SIZE
+        return qr_img.resize((size, size), Image.Resampling.NEAREST)
+
+    def get_background(self, context, qr_size):
+        """Returns the prerendered text part of a label, drawing it on first use"""
+        key = (context, qr_size)
+        with self._lock:
+            if key in self._backgrounds:
+                self._backgrounds.move_to_end(key)
+                return self._backgrounds[key]
+
+        background = Image.new(
+            "RGB",
+            (context.label_width + qr_size, qr_size + self.CODE_AREA_HEIGHT),
+            "white",
+        )
+        d = ImageDraw.Draw(background)
+        x_offset, y_offset = self.TEXT_OFFSET
+        for line in context.lines:
+            d.text((x_offset, y_offset), line, fill="black", font=self.font)
+            y_offset += self.LINE_HEIGHT
+
+        with self._lock:
+            self._backgrounds[key] = background
+            if len(self._backgrounds) > self.cache_size:
+                self._backgrounds.popitem(last=False)
+        return background
+
+    def render_image(self, numeric_code, context):
+        """Renders a label as a PIL image"""
+        qr_img = self.render_qr_matrix(numeric_code)
+        qr_size = qr_img.size[0]
+
+        label = self.get_background(context, qr_size).copy()
+        label.paste(qr_img, (context.label_width, 0))
+
+        # Add the numeric code below the QR code
+        d = ImageDraw.Draw(label)
+        bbox = d.textbbox((0, 0), numeric_code, font=self.font)
+        code_width = bbox[2] - bbox[0]
+        code_x = context.label_width + (qr_size - code_width) // 2
+        code_y = qr_size - 20
+        d.text((code_x, code_y), numeric_code, fill="black", font=self.font)
+        return label
+
+    def render_svg(self, numeric_code, context):
+        """
+        Renders a label as SVG bytes with the same layout as `render_image`.
+
+        Dark modules are merged into horizontal runs and drawn as a single
+        path, the text stays text, so labels print sharp at any size.
+        """
+        matrix = self.get_qr_matrix(numeric_code)
+        modules = len(matrix)
+        qr_size = modules * self.BOX_SIZE
+        width = context.label_width + qr_size
+        height = qr_size + self.CODE_AREA_HEIGHT
+
+        path = []
+        for y, row in enumerate(matrix):
+            x = 0
+            while x < modules:
+                if not row[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < modules and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}h{x - start}v1h{start - x}z")
+
+        # SVG text is positioned by its baseline, PIL text by its top
+        x_offset, y_offset = self.TEXT_OFFSET
+        lines = [
+            f'<text x="{x_offset}" y="{y_offset + index * self.LINE_HEIGHT + self.FONT_SIZE}">'
+            f"{escape(line)}</text>"
+            for index, line in enumerate(context.lines)
+        ]
+        code_x = context.label_width + qr_size // 2
+        code_y = qr_size - 20 + self.FONT_SIZE
+
+        return "".join(
+            [
+                f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+                f'height="{height}" viewBox="0 0 {width} {height}">',
+                f'<rect width="{width}" height="{height}" fill="#fff"/>',
+                f'<g font-family="Arial, Helvetica, sans-serif" font-size="{self.FONT_SIZE}">',
+                *lines,
+                f'<text x="{code_x}" y="{code_y}" text-anchor="middle">'
+                f"{escape(numeric_code)}</text>",
+                "</g>",
+                f'<path transform="translate({context.label_width} 0) scale({self.BOX_SIZE})" '
+                f'shape-rendering="crispEdges" d="{"".join(path)}"/>',
+                "</svg>",
+            ]
+        ).encode()
+
+    def render(self, numeric_code, context, format="png"):
+        """Renders a label as PNG or SVG bytes"""
+        if format == "svg":
+            return self.render_svg(numeric_code, context)
+        buffer = BytesIO()
+        self.render_image(numeric_code, context).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+label_renderer = LabelRenderer()
@@ -0,0 +1,32 @@
+from django.db import transaction
+from tracker.models import MaterialPiece
+from tracker.services.codes import MATERIAL_PIECE_PREFIX, assign_qr_codes
+from tracker.services.rendering import enqueue_qr_render
+
+
+# --- BULK PIECE CREATION ---
+
+
+@transaction.atomic
+def create_material_pieces(bundle, quantity=None):
+    """
+    Creates the material pieces of a bundle with a single bulk insert.
+
+    Codes are reserved as one block and assigned before the insert, so each
+    piece is written once. No save signals fire, and the QR images are only
+    queued for rendering.
+    """
+    quantity = bundle.quantity if quantity is None else quantity
+    pieces = [
+        MaterialPiece(
+            bundle=bundle,
+            created_by=bundle.created_by,
+            updated_by=bundle.updated_by,
+        )
+        for _ in range(quantity)
+    ]
+    assign_qr_codes(pieces, prefix=MATERIAL_PIECE_PREFIX)
+    pieces = MaterialPiece.objects.bulk_create(pieces, batch_size=1000)
+
+    enqueue_qr_render(material_pieces=pieces)
+    return pieces
@@ -0,0 +1,209 @@
+import zlib
+from itertools import groupby
+from PIL import Image
+from tracker.models import Bundle, MaterialPiece
+from tracker.services.labels import (
+    BUNDLE_LABEL_RELATED_FIELDS,
+    LabelContext,
+    label_renderer,
+)
+
+
+# --- LABEL SOURCES ---
+
+
+def _iter_bundle_labels(bundles):
+    """Yields (code, context) for each bundle followed by its pieces"""
+    bundles = {bundle.id: bundle for bundle in bundles}
+    pieces = (
+        MaterialPiece.objects.filter(bundle_id__in=bundles, qr_code__isnull=False)
+        .order_by("bundle_id", "id")
+        .values_list("bundle_id", "qr_code")
+        .iterator(chunk_size=2000)
+    )
+    pieces_by_bundle = groupby(pieces, key=lambda piece: piece[0])
+
+    next_group = next(pieces_by_bundle, None)
+    for bundle_id, bundle in bundles.items():
+        if bundle.qr_code:
+            yield bundle.qr_code, LabelContext.for_bundle(bundle)
+
+        if next_group and next_group[0] == bundle_id:
+            context = LabelContext.for_material_pieces(bundle)
+            for _, qr_code in next_group[1]:
+                yield qr_code, context
+            next_group = next(pieces_by_bundle, None)
+
+
+def iter_bundle_labels(bundle_queryset):
+    """Yields the labels of the bundles of a queryset and of their pieces"""
+    bundles = bundle_queryset.select_related(
+        "material__material_type", *BUNDLE_LABEL_RELATED_FIELDS
+    ).order_by("id")
+    return _iter_bundle_labels(bundles)
+
+
+def iter_production_batch_labels(production_batch):
+    """Yields every bundle and piece label of a production batch"""
+    return iter_bundle_labels(Bundle.objects.filter(production_batch=production_batch))
+
+
+# --- PAGE LAYOUT ---
+
+
+class LabelSheetLayout:
+    """Tiles labels onto A4 pages rendered at a fixed resolution"""
+
+    DPI = 150
+    PAGE_SIZE_MM = (210, 297)
+    MARGIN_PX = 25
+    GAP_PX = 10
+
+    def __init__(self, label_size=(590, 320)):
+        self.page_size = tuple(round(mm / 25.4 * self.DPI) for mm in self.PAGE_SIZE_MM)
+        self.label_size = label_size
+        usable_width = self.page_size[0] - 2 * self.MARGIN_PX + self.GAP_PX
+        usable_height = self.page_size[1] - 2 * self.MARGIN_PX + self.GAP_PX
+        self.columns = max(1, usable_width // (label_size[0] + self.GAP_PX))
+        self.rows = max(1, usable_height // (label_size[1] + self.GAP_PX))
+
+    @property
+    def labels_per_page(self):
+        return self.columns * self.rows
+
+    def position(self, index):
+        column, row = index % self.columns, index // self.columns
+        return (
+            self.MARGIN_PX + column * (self.label_size[0] + self.GAP_PX),
+            self.MARGIN_PX + row * (self.label_size[1] + self.GAP_PX),
+        )
+
+    def iter_pages(self, labels):
+        """Renders labels page by page, only one page is held in memory"""
+        page = None
+        index = 0
+        for qr_code, context in labels:
+            if page is None:
+                page = Image.new("L", self.page_size, 255)
+            label = label_renderer.render_image(qr_code, context).convert("L")
+            label.thumbnail(self.label_size)
+            page.paste(label, self.position(index))
+            index += 1
+            if index == self.labels_per_page:
+                yield page
+                page, index = None, 0
+        if page is not None:
+            yield page
+
+
+# --- PDF STREAMING ---
+
+
+class StreamingPDFWriter:
+    """
+    Writes a PDF of full-page grayscale images incrementally.
+
+    Each page is emitted as soon as it is rendered. The page tree and the
+    cross-reference table are written at the end, once all offsets are known.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self, dpi):
+        self.dpi = dpi
+        self.offsets = {}
+        self.position = 0
+        self.next_id = 3
+        self.page_ids = []
+
+    def _emit(self, data):
+        self.position += len(data)
+        return data
+
+    def _object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.position
+        data = f"{obj_id} 0 obj\n".encode() + body
+        if stream is not None:
+            data += b"\nstream\n" + stream + b"\nendstream"
+        return self._emit(data + b"\nendobj\n")
+
+    def _allocate_id(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def header(self):
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def page(self, image):
+        image_id, content_id, page_id = (self._allocate_id() for _ in range(3))
+        self.page_ids.append(page_id)
+
+        width, height = image.size
+        width_pt = width * 72 / self.dpi
+        height_pt = height * 72 / self.dpi
+        pixels = zlib.compress(image.tobytes(), 6)
+        content = f"q {width_pt:.2f} 0 0 {height_pt:.2f} 0 0 cm /Im0 Do Q".encode()
+
+        return b"".join(
+            [
+                self._object(
+                    image_id,
+                    (
+                        f"<< /Type /XObject /Subtype /Image /Width {width} "
+                        f"/Height {height} /ColorSpace /DeviceGray "
+                        f"/BitsPerComponent 8 /Filter /FlateDecode "
+                        f"/Length {len(pixels)} >>"
+                    ).encode(),
+                    pixels,
+                ),
+                self._object(
+                    content_id, f"<< /Length {len(content)} >>".encode(), content
+                ),
+                self._object(
+                    page_id,
+                    (
+                        f"<< /Type /Page /Parent {self.PAGES_ID} 0 R "
+                        f"/MediaBox [0 0 {width_pt:.2f} {height_pt:.2f}] "
+                        f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> "
+                        f"/Contents {content_id} 0 R >>"
+                    ).encode(),
+                ),
+            ]
+        )
+
+    def trailer(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        data = self._object(
+            self.PAGES_ID,
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode(),
+        )
+        data += self._object(
+            self.CATALOG_ID,
+            f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>".encode(),
+        )
+
+        xref_offset = self.position
+        object_count = self.next_id
+        xref = [f"xref\n0 {object_count}\n", "0000000000 65535 f \n"]
+        xref += [
+            f"{self.offsets[obj_id]:010d} 00000 n \n"
+            for obj_id in range(1, object_count)
+        ]
+        xref.append(
+            f"trailer\n<< /Size {object_count} /Root {self.CATALOG_ID} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        )
+        return data + self._emit("".join(xref).encode())
+
+
+def stream_label_sheet_pdf(labels):
+    """Yields a print-ready PDF of labels chunk by chunk, one page at a time"""
+    layout = LabelSheetLayout()
+    writer = StreamingPDFWriter(dpi=layout.DPI)
+
+    yield writer.header()
+    for page in layout.iter_pages(labels):
+        yield writer.page(page)
+    yield writer.trailer()
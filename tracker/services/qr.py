@@ -0,0 +1,41 @@
+from tracker.models import Bundle, MaterialPiece
+from tracker.services.codes import BUNDLE_PREFIX, MATERIAL_PIECE_PREFIX, get_qr_number
+
+
+# --- QR CODE RESOLUTION ---
+
+
+class QRCodeResolver:
+    """
+    Resolves scanned QR codes to material pieces or bundles.
+
+    The first digit of a code selects the table (see
+    `tracker.services.codes`), so each lookup is a single probe of the
+    indexed integer `qr_number` column. Nothing is cached in the process, so
+    a code that was edited or reassigned in another process resolves to its
+    current object.
+    """
+
+    MODELS_BY_PREFIX = {
+        MATERIAL_PIECE_PREFIX: MaterialPiece,
+        BUNDLE_PREFIX: Bundle,
+    }
+
+    def resolve(self, qr_data):
+        """Returns a (model, id) tuple for a QR code, or None if it is unknown"""
+        qr_number = get_qr_number(qr_data)
+        model = qr_number and self.MODELS_BY_PREFIX.get(qr_data[0])
+        if not model:
+            return None
+
+        object_id = (
+            model.objects.filter(qr_number=qr_number)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if object_id is None:
+            return None
+        return model, object_id
+
+
+qr_resolver = QRCodeResolver()
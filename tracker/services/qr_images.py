@@ -0,0 +1,95 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from django.conf import settings
+from tracker.models import Bundle, MaterialPiece
+from tracker.services.labels import (
+    BUNDLE_LABEL_RELATED_FIELDS,
+    MATERIAL_LABEL_RELATED_FIELDS,
+    LabelContext,
+    label_renderer,
+)
+from tracker.services.qr import qr_resolver
+
+
+# --- ON-DEMAND QR IMAGES ---
+
+
+def is_on_demand_mode():
+    """True when QR images are rendered by a view instead of being stored"""
+    return settings.QR_IMAGE_MODE == "on_demand"
+
+
+class QRImageCache:
+    """Thread-safe LRU cache of rendered label images, bounded by total bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._images = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def set(self, key, image):
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._images[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes and self._images:
+                _, evicted = self._images.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.size = 0
+
+
+qr_image_cache = QRImageCache(settings.QR_IMAGE_CACHE_BYTES)
+
+
+def get_label_context(qr_code):
+    """Returns the label context of the object behind a QR code, or None"""
+    resolved = qr_resolver.resolve(qr_code)
+    if resolved is None:
+        return None
+
+    model, object_id = resolved
+    if model is MaterialPiece:
+        piece = (
+            MaterialPiece.objects.select_related(*MATERIAL_LABEL_RELATED_FIELDS)
+            .filter(pk=object_id)
+            .first()
+        )
+        return piece and LabelContext.for_material_pieces(piece.bundle)
+
+    bundle = (
+        Bundle.objects.select_related(*BUNDLE_LABEL_RELATED_FIELDS)
+        .filter(pk=object_id)
+        .first()
+    )
+    return bundle and LabelContext.for_bundle(bundle)
+
+
+def get_label_etag(qr_code, context, format):
+    """Strong ETag derived from everything printed on the label"""
+    payload = "\n".join((format, qr_code, str(context.label_width), *context.lines))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def get_label_image(qr_code, context, format):
+    """Returns the PNG or SVG bytes of a label, rendering it on a cache miss"""
+    key = (qr_code, context, format)
+    image = qr_image_cache.get(key)
+    if image is None:
+        image = label_renderer.render(qr_code, context, format)
+        qr_image_cache.set(key, image)
+    return image
@@ -0,0 +1,269 @@
+import logging
+import os
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from common.services.files import journal_files
+from tracker.models import Bundle, MaterialPiece, QRRenderJob
+from tracker.services.labels import (
+    BUNDLE_LABEL_RELATED_FIELDS,
+    MATERIAL_LABEL_RELATED_FIELDS,
+    LabelContext,
+    label_renderer,
+)
+from tracker.services.qr_images import is_on_demand_mode
+from tracker.utils import get_label_format
+
+
+logger = logging.getLogger(__name__)
+
+# --- QUEUE ---
+
+
+def enqueue_qr_render(material_pieces=(), bundles=()):
+    """
+    Queues QR label rendering for material pieces and bundles.
+
+    Objects that already have a job are queued again. Only writes to the
+    database, the images are rendered by `drain_qr_render_queue`. Nothing is
+    queued when QR images are rendered on demand.
+    """
+    if is_on_demand_mode():
+        return
+
+    piece_ids = [piece.id for piece in material_pieces]
+    bundle_ids = [bundle.id for bundle in bundles]
+
+    QRRenderJob.objects.bulk_create(
+        [QRRenderJob(material_piece_id=piece_id) for piece_id in piece_ids]
+        + [QRRenderJob(bundle_id=bundle_id) for bundle_id in bundle_ids],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+    QRRenderJob.objects.filter(
+        Q(material_piece_id__in=piece_ids) | Q(bundle_id__in=bundle_ids)
+    ).exclude(status=QRRenderJob.JobStatus.PENDING).update(
+        status=QRRenderJob.JobStatus.PENDING, error=None
+    )
+
+
+def enqueue_missing_qr_renders(chunk_size=2000):
+    """
+    Queues every material piece and bundle without a QR image, `chunk_size`
+    objects at a time.
+
+    Returns the number of queued (material pieces, bundles).
+    """
+    missing = Q(qr_image="") | Q(qr_image__isnull=True)
+    counts = []
+    for model, argument in ((MaterialPiece, "material_pieces"), (Bundle, "bundles")):
+        ids = (
+            model.objects.filter(missing)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+        count = 0
+        while chunk := list(islice(ids, chunk_size)):
+            enqueue_qr_render(**{argument: [model(id=obj_id) for obj_id in chunk]})
+            count += len(chunk)
+        counts.append(count)
+    return tuple(counts)
+
+
+def create_missing_qr_variants(chunk_size=2000):
+    """
+    Generates the image variants missing for stored QR images, e.g. of labels
+    rendered before the variant was defined.
+
+    Returns the number of variants written.
+    """
+    created = 0
+    for model in (MaterialPiece, Bundle):
+        objects = (
+            model.objects.exclude(Q(qr_image="") | Q(qr_image__isnull=True))
+            .only("id", "qr_image")
+            .order_by("id")
+            .iterator(chunk_size=chunk_size)
+        )
+        for obj in objects:
+            try:
+                created += obj.qr_image.create_variants(missing_only=True)
+            except Exception as e:
+                logger.error(f"Error creating QR image variants of {obj!r}: {e}")
+    return created
+
+
+@transaction.atomic
+def claim_qr_render_jobs(batch_size):
+    """Marks a batch of pending jobs as processing and returns them"""
+    job_ids = list(
+        QRRenderJob.objects.select_for_update(skip_locked=True)
+        .filter(status=QRRenderJob.JobStatus.PENDING)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    QRRenderJob.objects.filter(id__in=job_ids).update(
+        status=QRRenderJob.JobStatus.PROCESSING, attempts=F("attempts") + 1
+    )
+    return list(QRRenderJob.objects.filter(id__in=job_ids))
+
+
+# --- WORKER ---
+
+
+def render_label_file(payload):
+    """
+    Process pool entry point, renders and encodes one label from plain data.
+
+    Raster labels are encoded once, straight from the in-memory image, with
+    the settings of the image field they are stored in.
+    """
+    numeric_code, context, field = payload
+    if get_label_format(field.model) == "svg":
+        return ContentFile(
+            label_renderer.render_svg(numeric_code, context),
+            name=f"{numeric_code}.svg",
+        )
+    image = label_renderer.render_image(numeric_code, context)
+    return field.optimize(image, name=f"{numeric_code}.png")
+
+
+def _render_label_file_or_error(payload):
+    """Like `render_label_file`, but returns (file, error) instead of raising"""
+    try:
+        return render_label_file(payload), None
+    except Exception as e:
+        return None, str(e) or e.__class__.__name__
+
+
+def _store_rendered_images(model, objects, results):
+    """
+    Saves rendered images to storage and the objects with one bulk update.
+
+    Replaced images are journaled for `cleanup_files` in the same
+    transaction as the update, so they are only deleted once it commits.
+    Returns a dict of {object id: error} for the objects that failed.
+    """
+    stored = []
+    replaced_names = []
+    errors = {}
+    for obj, (image, error) in zip(objects, results):
+        if error is None:
+            old_name = obj.qr_image.name
+            try:
+                obj.qr_image.save(image.name, image, save=False)
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+        if error is None:
+            stored.append(obj)
+            replaced_names.append(old_name)
+        else:
+            logger.error(f"Error rendering QR image of {obj!r}: {error}")
+            errors[obj.id] = error
+    with transaction.atomic():
+        journal_files(model._meta.get_field("qr_image"), replaced_names)
+        model.objects.bulk_update(stored, ["qr_image"], batch_size=500)
+    return errors
+
+
+def process_qr_render_jobs(jobs, executor=None):
+    """
+    Renders the labels of a batch of claimed jobs and records their status.
+
+    Label data is loaded with two queries for the whole batch. Rendering
+    runs on `executor` when given, otherwise in the current process. Each
+    job succeeds or fails on its own.
+    """
+    pieces = list(
+        MaterialPiece.objects.filter(
+            id__in=[job.material_piece_id for job in jobs if job.material_piece_id],
+            qr_code__isnull=False,
+        )
+        .select_related(*MATERIAL_LABEL_RELATED_FIELDS)
+        .order_by("bundle_id", "id")
+    )
+    bundles = list(
+        Bundle.objects.filter(
+            id__in=[job.bundle_id for job in jobs if job.bundle_id],
+            qr_code__isnull=False,
+        ).select_related(*BUNDLE_LABEL_RELATED_FIELDS)
+    )
+
+    # Pieces of the same bundle share one label context
+    piece_field = MaterialPiece._meta.get_field("qr_image")
+    bundle_field = Bundle._meta.get_field("qr_image")
+    piece_contexts = {}
+    payloads = []
+    for piece in pieces:
+        if piece.bundle_id not in piece_contexts:
+            piece_contexts[piece.bundle_id] = LabelContext.for_material_pieces(
+                piece.bundle
+            )
+        payloads.append((piece.qr_code, piece_contexts[piece.bundle_id], piece_field))
+    payloads += [
+        (bundle.qr_code, LabelContext.for_bundle(bundle), bundle_field)
+        for bundle in bundles
+    ]
+
+    if executor:
+        # Consecutive labels share a context, so chunks reuse backgrounds
+        results = list(
+            executor.map(_render_label_file_or_error, payloads, chunksize=32)
+        )
+    else:
+        results = [_render_label_file_or_error(payload) for payload in payloads]
+    piece_errors = _store_rendered_images(MaterialPiece, pieces, results[: len(pieces)])
+    bundle_errors = _store_rendered_images(Bundle, bundles, results[len(pieces) :])
+
+    # Jobs whose object has no code yet cannot be rendered
+    piece_ids = {piece.id for piece in pieces}
+    bundle_ids = {bundle.id for bundle in bundles}
+    errors_by_job = {}
+    for job in jobs:
+        if job.material_piece_id in piece_ids:
+            error = piece_errors.get(job.material_piece_id)
+        elif job.bundle_id in bundle_ids:
+            error = bundle_errors.get(job.bundle_id)
+        else:
+            error = "Object has no QR code"
+        errors_by_job[job.id] = error
+
+    job_ids_by_error = {}
+    for job_id, error in errors_by_job.items():
+        job_ids_by_error.setdefault(error, []).append(job_id)
+    for error, job_ids in job_ids_by_error.items():
+        status = (
+            QRRenderJob.JobStatus.FAILED if error else QRRenderJob.JobStatus.RENDERED
+        )
+        QRRenderJob.objects.filter(id__in=job_ids).update(status=status, error=error)
+    return len(job_ids_by_error.get(None, ()))
+
+
+def drain_qr_render_queue(workers=None, batch_size=200):
+    """
+    Renders every pending QR label job, in parallel across `workers`
+    processes (defaults to the number of CPU cores).
+
+    Returns the number of rendered labels.
+    """
+    workers = workers or os.cpu_count() or 1
+    rendered = 0
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while jobs := claim_qr_render_jobs(batch_size):
+            rendered += process_qr_render_jobs(jobs, executor=executor)
+    finally:
+        if executor:
+            executor.shutdown()
+    return rendered
+
+
+def requeue_qr_render_jobs(statuses):
+    """Puts failed (or stuck processing) jobs back in the queue"""
+    return QRRenderJob.objects.filter(status__in=statuses).update(
+        status=QRRenderJob.JobStatus.PENDING, error=None
+    )
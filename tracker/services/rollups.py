@@ -0,0 +1,175 @@
+import threading
+from functools import partial
+from django.db import transaction
+from django.db.models import F, Max
+from django.db.models.functions import Coalesce, Greatest
+from tracker.models import (
+    MaterialPiece,
+    ProductionBatch,
+    ProductionLineRollup,
+    ScanEvent,
+)
+from tracker.services.dashboard import COUNTER_FIELDS, compute_line_totals
+
+
+# --- LOCKING ---
+
+
+def lock_production_batches(production_batch_ids):
+    """
+    Locks batch rows until the transaction ends. Everything that writes
+    rollups locks their batch first, so a delta is never applied while the
+    batch is rebuilt or invalidated, and a batch with rollups has all of them.
+    """
+    list(
+        ProductionBatch.objects.select_for_update()
+        .filter(pk__in=production_batch_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+# --- INCREMENTAL UPDATES ---
+
+
+@transaction.atomic
+def apply_rollup_delta(
+    production_batch_id, before, after, scanned_line_id=None, scan_time=None
+):
+    """
+    Adds the difference between two `compute_line_totals` results for the
+    same pieces to the stored rollups of a batch.
+
+    A batch without rollups, scanned before they existed or invalidated, is
+    rebuilt in full by its next scan; other changes leave it computed live.
+    Missing rollup rows are only created for the scanned line or for counters
+    that grow, so removing scans never recreates rows of a deleted batch.
+    """
+    lock_production_batches([production_batch_id])
+    if not ProductionLineRollup.objects.filter(
+        production_batch_id=production_batch_id
+    ).exists():
+        if scanned_line_id is not None:
+            rebuild_rollups(production_batch_id)
+        return
+
+    for line_id in (set(before) | set(after) | {scanned_line_id}) - {None}:
+        old_totals = before.get(line_id, {})
+        new_totals = after.get(line_id, {})
+        delta = {
+            field: new_totals.get(field, 0) - old_totals.get(field, 0)
+            for field in COUNTER_FIELDS
+        }
+        if line_id != scanned_line_id and not any(delta.values()):
+            continue
+
+        rollups = ProductionLineRollup.objects.filter(
+            production_batch_id=production_batch_id, production_line_id=line_id
+        )
+        if line_id == scanned_line_id or any(value > 0 for value in delta.values()):
+            ProductionLineRollup.objects.get_or_create(
+                production_batch_id=production_batch_id, production_line_id=line_id
+            )
+        updates = {field: F(field) + value for field, value in delta.items() if value}
+        if line_id == scanned_line_id:
+            updates["last_scan_at"] = Greatest(
+                Coalesce("last_scan_at", scan_time), scan_time
+            )
+        if updates:
+            rollups.update(**updates)
+
+
+# --- EDITS OUTSIDE SCAN INGESTION ---
+
+# Line totals of pieces captured before a scan event or quality check is
+# saved or deleted, per thread
+_piece_snapshots = threading.local()
+
+
+def _get_piece_snapshots():
+    if not hasattr(_piece_snapshots, "totals"):
+        _piece_snapshots.totals = {}
+    return _piece_snapshots.totals
+
+
+def snapshot_piece_totals(piece_ids):
+    """Records the line totals of pieces before their scans are changed"""
+    snapshots = _get_piece_snapshots()
+    pieces = MaterialPiece.objects.filter(id__in=piece_ids).values_list(
+        "id", "bundle__production_batch_id"
+    )
+    for piece_id, batch_id in pieces:
+        snapshots[piece_id] = (
+            batch_id,
+            compute_line_totals(batch_id, piece_ids=[piece_id]),
+        )
+
+
+def apply_piece_totals_change(piece_ids):
+    """
+    Applies the change in line totals since `snapshot_piece_totals` to the
+    rollups.
+
+    The snapshot moves forward with every change, so a cascade that removes
+    several scans of the same piece applies each difference once.
+    """
+    snapshots = _get_piece_snapshots()
+    for piece_id in piece_ids:
+        if piece_id not in snapshots:
+            continue
+        batch_id, before = snapshots[piece_id]
+        after = compute_line_totals(batch_id, piece_ids=[piece_id])
+        apply_rollup_delta(batch_id, before, after)
+        snapshots[piece_id] = (batch_id, after)
+        transaction.on_commit(partial(snapshots.pop, piece_id, None))
+
+
+# --- INVALIDATION ---
+
+
+@transaction.atomic
+def invalidate_rollups(production_batch_ids):
+    """
+    Drops the rollups of batches whose counters can no longer be updated by
+    deltas, e.g. after a cascading delete. Until the next scan rebuilds them,
+    the dashboard computes these batches live.
+    """
+    lock_production_batches(production_batch_ids)
+    ProductionLineRollup.objects.filter(
+        production_batch_id__in=production_batch_ids
+    ).delete()
+
+
+# --- REBUILD ---
+
+
+@transaction.atomic
+def rebuild_rollups(production_batch):
+    """Recomputes the rollups of a batch (or batch id) from the raw scan events"""
+    production_batch_id = getattr(production_batch, "pk", production_batch)
+    lock_production_batches([production_batch_id])
+    totals = compute_line_totals(production_batch_id)
+    last_scans = dict(
+        ScanEvent.objects.filter(
+            material_piece__bundle__production_batch_id=production_batch_id,
+            scanner__production_line__isnull=False,
+        )
+        .values_list("scanner__production_line_id")
+        .annotate(last_scan_at=Max("scan_time"))
+        .order_by()
+    )
+
+    ProductionLineRollup.objects.filter(
+        production_batch_id=production_batch_id
+    ).delete()
+    return ProductionLineRollup.objects.bulk_create(
+        [
+            ProductionLineRollup(
+                production_batch_id=production_batch_id,
+                production_line_id=line_id,
+                last_scan_at=last_scans.get(line_id),
+                **totals.get(line_id, {}),
+            )
+            for line_id in set(totals) | set(last_scans)
+        ]
+    )
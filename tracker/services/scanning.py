@@ -0,0 +1,428 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from tracker.models import (
+    Bundle,
+    Defect,
+    MaterialPiece,
+    QualityCheck,
+    ReworkAssignment,
+    ScanEvent,
+    Scanner,
+    ScanSubmission,
+)
+from tracker.services.dashboard import compute_line_totals
+from tracker.services.qr import qr_resolver
+from tracker.services.rollups import apply_rollup_delta
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- SCAN INGESTION ---
+
+
+@transaction.atomic
+def ingest_scan(
+    scanner,
+    material_pieces,
+    quality_status=None,
+    defect_ids=None,
+    notes="",
+    rework_notes=None,
+    scan_time=None,
+):
+    """
+    Records a scan of one or more material pieces with bulk writes.
+
+    `scan_time` is when the scan was made, for scans uploaded after the
+    fact; it defaults to now.
+
+    Pieces already scanned by this scanner, including by a concurrent
+    request, are skipped and left out of everything below. Runs a constant
+    number of queries regardless of how many pieces are scanned, and keeps
+    the production line rollups of the affected batches up to date.
+
+    Returns the list of material pieces that were newly scanned.
+    """
+    production_line = scanner.production_line
+    pieces_by_id = {piece.id: piece for piece in material_pieces}
+    scan_time = scan_time or timezone.now()
+
+    # Lock the scanned pieces so concurrent scans of them apply one at a time
+    batch_by_piece = dict(
+        MaterialPiece.objects.select_for_update(of=("self",))
+        .filter(id__in=pieces_by_id)
+        .values_list("id", "bundle__production_batch_id")
+    )
+
+    # Skip pieces that already have a scan event for this scanner
+    already_scanned = set(
+        ScanEvent.objects.filter(
+            scanner=scanner, material_piece_id__in=pieces_by_id
+        ).values_list("material_piece_id", flat=True)
+    )
+    while True:
+        new_pieces = [
+            piece
+            for piece_id, piece in pieces_by_id.items()
+            if piece_id not in already_scanned
+        ]
+        if not new_pieces:
+            return []
+
+        # Snapshot the line totals of the new pieces before the scan is applied
+        piece_ids_by_batch = defaultdict(list)
+        for piece in new_pieces:
+            piece_ids_by_batch[batch_by_piece[piece.id]].append(piece.id)
+        totals_before = {
+            batch_id: compute_line_totals(batch_id, piece_ids=piece_ids)
+            for batch_id, piece_ids in piece_ids_by_batch.items()
+        }
+
+        try:
+            with transaction.atomic():
+                scan_events = ScanEvent.objects.bulk_create(
+                    [
+                        ScanEvent(
+                            scanner=scanner, material_piece=piece, scan_time=scan_time
+                        )
+                        for piece in new_pieces
+                    ]
+                )
+            break
+        except IntegrityError:
+            # Another worker scanned some of the pieces since they were checked;
+            # drop those and insert the rest again
+            scanned = set(
+                ScanEvent.objects.filter(
+                    scanner=scanner, material_piece_id__in=pieces_by_id
+                ).values_list("material_piece_id", flat=True)
+            )
+            if scanned <= already_scanned:
+                raise
+            already_scanned = scanned
+
+    new_piece_ids = [piece.id for piece in new_pieces]
+    if scan_events[0].pk is None:
+        # The database does not return the ids of bulk inserts
+        scan_event_ids = list(
+            ScanEvent.objects.filter(
+                scanner=scanner, material_piece_id__in=new_piece_ids
+            ).values_list("id", flat=True)
+        )
+    else:
+        scan_event_ids = [scan_event.pk for scan_event in scan_events]
+
+    if scanner.type == Scanner.ScannerType.IN:
+        # Update MaterialPiece location and production flow
+        MaterialPiece.objects.filter(id__in=new_piece_ids).update(
+            current_production_line=production_line, updated_at=scan_time
+        )
+        ProductionFlow = MaterialPiece.production_flow.through
+        ProductionFlow.objects.bulk_create(
+            [
+                ProductionFlow(
+                    materialpiece_id=piece_id, productionline_id=production_line.id
+                )
+                for piece_id in new_piece_ids
+            ],
+            ignore_conflicts=True,
+        )
+        for piece in new_pieces:
+            piece.current_production_line = production_line
+
+    elif scanner.type == Scanner.ScannerType.QC:
+        QualityCheck.objects.bulk_create(
+            [
+                QualityCheck(
+                    scan_event_id=scan_event_id, status=quality_status, notes=notes
+                )
+                for scan_event_id in scan_event_ids
+            ]
+        )
+        quality_check_ids = list(
+            QualityCheck.objects.filter(scan_event_id__in=scan_event_ids).values_list(
+                "id", flat=True
+            )
+        )
+
+        # Add defects if any
+        if defect_ids:
+            defect_ids = list(
+                Defect.objects.filter(id__in=defect_ids).values_list("id", flat=True)
+            )
+            QualityCheckDefect = QualityCheck.defects.through
+            QualityCheckDefect.objects.bulk_create(
+                [
+                    QualityCheckDefect(
+                        qualitycheck_id=quality_check_id, defect_id=defect_id
+                    )
+                    for quality_check_id in quality_check_ids
+                    for defect_id in defect_ids
+                ],
+                ignore_conflicts=True,
+            )
+
+        # Create rework assignments if status is REWORK
+        if quality_status == QualityCheck.QualityStatus.REWORK and rework_notes:
+            ReworkAssignment.objects.bulk_create(
+                [
+                    ReworkAssignment(
+                        quality_check_id=quality_check_id,
+                        rework_production_line=production_line,
+                        rework_notes=rework_notes,
+                    )
+                    for quality_check_id in quality_check_ids
+                ],
+                ignore_conflicts=True,
+            )
+
+    # For OUT scanners, we don't need to do anything special other than create the scan event
+    # The material_piece.production_flow already keeps track of history
+
+    # Apply the change in line totals to the rollups
+    for batch_id, piece_ids in sorted(piece_ids_by_batch.items()):
+        apply_rollup_delta(
+            batch_id,
+            totals_before[batch_id],
+            compute_line_totals(batch_id, piece_ids=piece_ids),
+            production_line.id,
+            scan_time,
+        )
+
+    return new_pieces
+
+
+# --- SCAN REQUESTS ---
+
+
+def parse_scan_time(value):
+    """
+    Parses the capture time sent with a scan, or returns None if invalid.
+
+    Scans without one are timed now. The time is clamped to the last
+    SCAN_MAX_CAPTURE_AGE seconds, so a wrong device clock cannot date scans
+    in the future or far in the past.
+    """
+    now = timezone.now()
+    if value is None:
+        return now
+    if not isinstance(value, str):
+        return None
+    try:
+        scan_time = parse_datetime(value)
+    except ValueError:
+        return None
+    if scan_time is None:
+        return None
+    if timezone.is_naive(scan_time):
+        scan_time = timezone.make_aware(scan_time)
+    earliest = now - timedelta(seconds=settings.SCAN_MAX_CAPTURE_AGE)
+    return min(max(scan_time, earliest), now)
+
+
+def process_scan_data(data, scanners=None):
+    """
+    Validates and applies the payload of a single scan request.
+
+    `scanners` is an optional dict used to cache scanners by name across
+    several scans. Returns a (response data, HTTP status) tuple.
+    """
+    qr_data = data.get("qr_data")
+    scanner_name = data.get("scanner_name")
+
+    # For QC scanners, we might get additional data
+    quality_status = data.get("quality_status")
+    defect_ids = data.get("defect_ids", [])
+    rework_notes = data.get("rework_notes")
+
+    if not isinstance(scanner_name, str):
+        return {"error": "Scanner not found"}, 400
+    if defect_ids is None:
+        defect_ids = []
+    if not isinstance(defect_ids, list) or not all(
+        isinstance(defect_id, int) and not isinstance(defect_id, bool)
+        for defect_id in defect_ids
+    ):
+        return {"error": "Defect IDs must be a list of integers"}, 400
+    if not all(
+        isinstance(value, (str, type(None)))
+        for value in (data.get("notes"), rework_notes)
+    ):
+        return {"error": "Notes must be text"}, 400
+    scan_time = parse_scan_time(data.get("scanned_at"))
+    if scan_time is None:
+        return {"error": "Invalid scan time"}, 400
+
+    if scanners is None:
+        scanners = {}
+    try:
+        if scanner_name not in scanners:
+            scanners[scanner_name] = Scanner.objects.select_related(
+                "production_line"
+            ).get(name=scanner_name)
+        scanner = scanners[scanner_name]
+    except Scanner.DoesNotExist:
+        return {"error": "Scanner not found"}, 400
+
+    production_line = scanner.production_line
+    if not production_line:
+        return {"error": "Scanner is not assigned to a production line."}, 400
+
+    # For QC scanners, the quality status is required
+    if scanner.type == Scanner.ScannerType.QC and not quality_status:
+        return {"error": "Quality status is required for QC scanners"}, 400
+    if (
+        scanner.type == Scanner.ScannerType.QC
+        and quality_status not in QualityCheck.QualityStatus.values
+    ):
+        return {"error": "Invalid quality status"}, 400
+
+    # Resolve the QR code to a Material Piece or a Bundle by its prefix
+    resolved = qr_resolver.resolve(qr_data)
+    material_pieces = []
+    if resolved:
+        model, object_id = resolved
+        pieces = MaterialPiece.objects.select_related("bundle__material")
+        if model is MaterialPiece:
+            material_pieces = list(pieces.filter(pk=object_id))
+        else:
+            # Get all material pieces from this bundle
+            material_pieces = list(pieces.filter(bundle_id=object_id))
+            if not material_pieces and Bundle.objects.filter(pk=object_id).exists():
+                return {"error": "Bundle found but it has no material pieces"}, 400
+
+    if not material_pieces:
+        return {
+            "error": "Invalid QR code - not matching any Material Piece or Bundle"
+        }, 400
+
+    # Process all material pieces in bulk
+    processed_pieces = ingest_scan(
+        scanner,
+        material_pieces,
+        quality_status=quality_status,
+        defect_ids=defect_ids,
+        notes=data.get("notes") or "",
+        rework_notes=rework_notes,
+        scan_time=scan_time,
+    )
+    processed_count = len(processed_pieces)
+
+    # Generate appropriate message based on scan result
+    if processed_count == 0:
+        return {
+            "message": "All pieces in this scan were already processed",
+            "status": "success",
+        }, 200
+
+    if len(material_pieces) > 1:
+        # Bundle scan
+        bundle_name = material_pieces[0].bundle.material.name
+        if scanner.type == Scanner.ScannerType.IN:
+            message = f"Bundle {bundle_name}: {processed_count} pieces scanned at {production_line.name}"
+        elif scanner.type == Scanner.ScannerType.QC:
+            message = f"Bundle {bundle_name}: {processed_count} pieces quality checked as {quality_status}"
+        else:  # OUT
+            message = f"Bundle {bundle_name}: {processed_count} pieces completed at {production_line.name}"
+    else:
+        # Single piece scan
+        piece_name = material_pieces[0].bundle.material.name
+        if scanner.type == Scanner.ScannerType.IN:
+            message = f"Material Piece {piece_name} scanned at {production_line.name}"
+        elif scanner.type == Scanner.ScannerType.QC:
+            message = (
+                f"Quality Check completed for {piece_name} with status {quality_status}"
+            )
+        else:  # OUT
+            message = f"Material Piece {piece_name} completed at {production_line.name}"
+
+    return {"message": message, "status": "success"}, 200
+
+
+def is_valid_idempotency_key(key):
+    return isinstance(key, str) and 0 < len(key) <= 64
+
+
+@transaction.atomic
+def process_scan_batch(scans):
+    """
+    Applies a list of queued scans in order inside one transaction.
+
+    Each scan carries a client-generated `idempotency_key`. Scans whose key
+    was already applied are not applied again; their original response is
+    returned instead. A failing scan is rolled back on its own and does not
+    affect the others; only database errors are marked for retry. Each scan is recorded in the same savepoint that
+    applies it, so a key flushed by two devices at once is applied only once.
+
+    Returns one result per scan, in the order received.
+    """
+    keys = [
+        scan.get("idempotency_key")
+        for scan in scans
+        if isinstance(scan, dict)
+        and is_valid_idempotency_key(scan.get("idempotency_key"))
+    ]
+    applied = dict(
+        ScanSubmission.objects.filter(idempotency_key__in=keys).values_list(
+            "idempotency_key", "response"
+        )
+    )
+
+    scanners = {}
+    results = []
+    for scan in scans:
+        key = scan.get("idempotency_key") if isinstance(scan, dict) else None
+        if not is_valid_idempotency_key(key):
+            # Echo only keys the client can match against its queue
+            results.append(
+                {
+                    "idempotency_key": key if isinstance(key, str) else None,
+                    "error": "A valid idempotency key is required",
+                }
+            )
+            continue
+
+        if key in applied:
+            results.append({"idempotency_key": key, **applied[key], "duplicate": True})
+            continue
+
+        try:
+            with transaction.atomic():
+                response, status = process_scan_data(scan, scanners=scanners)
+                # Only applied scans are recorded; failed ones can be sent again
+                if status == 200:
+                    ScanSubmission.objects.create(
+                        idempotency_key=key,
+                        scanner=scanners.get(scan.get("scanner_name")),
+                        response=response,
+                    )
+        except IntegrityError:
+            # Another device applied the same scan meanwhile; this one is undone
+            original = (
+                ScanSubmission.objects.filter(idempotency_key=key)
+                .values_list("response", flat=True)
+                .first()
+            )
+            if original is not None:
+                applied[key] = original
+                results.append({"idempotency_key": key, **original, "duplicate": True})
+                continue
+            response, status = {"error": "Scan could not be saved", "retry": True}, 500
+        except DatabaseError:
+            response, status = {"error": "Scan could not be saved", "retry": True}, 500
+        except Exception:
+            # A scan that cannot be processed is reported, not retried
+            logger.exception(f"Error processing queued scan {key}")
+            response, status = {"error": "Scan could not be processed"}, 500
+
+        results.append({"idempotency_key": key, **response, "duplicate": False})
+        if status == 200:
+            applied[key] = response
+
+    return results
@@ -1,27 +1,239 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from tracker.models import MaterialPiece, Bundle
-from tracker.utils import generate_material_qr_code, generate_bundle_qr_code
+from django.db.models import Q, QuerySet
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from tracker.models import (
+    MaterialPiece,
+    Bundle,
+    QualityCheck,
+    ScanEvent,
+    Scanner,
+)
+from tracker.services.codes import (
+    BUNDLE_PREFIX,
+    MATERIAL_PIECE_PREFIX,
+    assign_qr_codes,
+    get_qr_number,
+)
+from tracker.services.pieces import create_material_pieces
+from tracker.services.rendering import enqueue_qr_render
+from tracker.services.rollups import (
+    apply_piece_totals_change,
+    invalidate_rollups,
+    snapshot_piece_totals,
+)
 
 
 # --- QR CODE GENERATION SIGNALS ---
 
 
+def sync_qr_number(instance):
+    """Keep qr_number derived from an edited QR code"""
+    instance.qr_number = get_qr_number(instance.qr_code)
+
+
+@receiver(pre_save, sender=MaterialPiece)
+def material_piece_pre_save(sender, instance, **kwargs):
+    """Assign the QR code before save, so the piece is written once"""
+    if not instance.qr_code:
+        assign_qr_codes([instance], prefix=MATERIAL_PIECE_PREFIX)
+        instance._qr_code_assigned = True
+    sync_qr_number(instance)
+
+
 @receiver(post_save, sender=MaterialPiece)
 def material_piece_post_save(sender, instance, created, **kwargs):
-    """Handle automatic QR code generation after save"""
-    if created or not instance.qr_code:
-        generate_material_qr_code(instance)
+    """Queue the image of a new QR code for rendering"""
+    assigned = instance.__dict__.pop("_qr_code_assigned", False)
+    if created or assigned:
+        enqueue_qr_render(material_pieces=[instance])
+
+
+@receiver(pre_save, sender=Bundle)
+def bundle_pre_save(sender, instance, **kwargs):
+    """Assign the QR code before save, so the bundle is written once"""
+    if not instance.qr_code:
+        assign_qr_codes([instance], prefix=BUNDLE_PREFIX)
+        instance._qr_code_assigned = True
+    sync_qr_number(instance)
 
 
 @receiver(post_save, sender=Bundle)
 def bundle_post_save(sender, instance, created, **kwargs):
     """
-    Handle automatic QR code generation after save
+    Queue the image of a new QR code for rendering
     Also create associated MaterialPiece objects
     """
+    assigned = instance.__dict__.pop("_qr_code_assigned", False)
     if created:
-        for _ in range(instance.quantity):
-            MaterialPiece.objects.create(bundle=instance)
-    if not instance.qr_code:
-        generate_bundle_qr_code(instance)
+        create_material_pieces(instance)
+    if created or assigned:
+        enqueue_qr_render(bundles=[instance])
+
+
+# --- ROLLUP SIGNALS ---
+# Scans are ingested with bulk writes that update the rollups themselves;
+# these keep them in step with scan events and quality checks edited or
+# deleted elsewhere, e.g. in the admin. Scans removed by a cascade from a
+# bundle, piece or scanner invalidate the rollups of their batches instead.
+
+
+def _get_origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _is_cascade(origin, sender):
+    """Whether a delete of `sender` rows was started from another model"""
+    return origin is not None and _get_origin_model(origin) not in (
+        sender,
+        ScanEvent,
+        QualityCheck,
+    )
+
+
+def invalidate_origin_rollups(origin, production_batch_ids):
+    """Invalidates batch rollups once per delete, however many rows it removes"""
+    invalidated = origin.__dict__.setdefault("_invalidated_rollup_batch_ids", set())
+    production_batch_ids = set(production_batch_ids) - invalidated - {None}
+    if production_batch_ids:
+        invalidate_rollups(production_batch_ids)
+        invalidated.update(production_batch_ids)
+
+
+def _get_rollup_piece_ids(instance):
+    """Returns the pieces whose totals a change to the instance affects"""
+    if isinstance(instance, ScanEvent):
+        piece_ids = {instance.material_piece_id}
+        events = Q(pk=instance.pk)
+    else:
+        piece_ids = set()
+        events = Q(pk=instance.scan_event_id)
+        if instance.pk:
+            events |= Q(quality_check__pk=instance.pk)
+
+    # Also include the piece the instance pointed to before an edit
+    if instance.pk or not piece_ids:
+        piece_ids.update(
+            ScanEvent.objects.filter(events).values_list("material_piece_id", flat=True)
+        )
+    return piece_ids - {None}
+
+
+@receiver(pre_save, sender=ScanEvent)
+@receiver(pre_save, sender=QualityCheck)
+@receiver(pre_delete, sender=ScanEvent)
+@receiver(pre_delete, sender=QualityCheck)
+def rollup_pre_change(sender, instance, raw=False, origin=None, **kwargs):
+    """Snapshot the line totals of the affected pieces before the change"""
+    if raw or _is_cascade(origin, sender):
+        return
+    instance._rollup_piece_ids = _get_rollup_piece_ids(instance)
+    snapshot_piece_totals(instance._rollup_piece_ids)
+
+
+@receiver(post_save, sender=ScanEvent)
+@receiver(post_save, sender=QualityCheck)
+@receiver(post_delete, sender=ScanEvent)
+@receiver(post_delete, sender=QualityCheck)
+def rollup_post_change(sender, instance, **kwargs):
+    """Apply the change in line totals of the affected pieces to the rollups"""
+    piece_ids = instance.__dict__.pop("_rollup_piece_ids", None)
+    if piece_ids:
+        apply_piece_totals_change(piece_ids)
+
+
+@receiver(pre_delete, sender=Bundle)
+def rollup_bundle_pre_delete(sender, instance, origin=None, **kwargs):
+    """Invalidate the rollups of the batch a bundle is deleted from"""
+    invalidate_origin_rollups(origin or instance, [instance.production_batch_id])
+
+
+@receiver(pre_delete, sender=MaterialPiece)
+def rollup_material_piece_pre_delete(sender, instance, origin=None, **kwargs):
+    """Invalidate the rollups of the batch of a piece deleted on its own"""
+    origin = origin or instance
+    if _get_origin_model(origin) is not MaterialPiece:
+        return  # Deleted with its bundle, which invalidates the batch
+    bundle_batches = origin.__dict__.setdefault("_rollup_bundle_batches", {})
+    if instance.bundle_id not in bundle_batches:
+        bundle_batches[instance.bundle_id] = (
+            Bundle.objects.filter(pk=instance.bundle_id)
+            .values_list("production_batch_id", flat=True)
+            .first()
+        )
+    invalidate_origin_rollups(origin, [bundle_batches[instance.bundle_id]])
+
+
+@receiver(pre_delete, sender=Scanner)
+def rollup_scanner_pre_delete(sender, instance, origin=None, **kwargs):
+    """Invalidate the rollups of every batch a deleted scanner has scanned"""
+    invalidate_origin_rollups(
+        origin or instance,
+        Bundle.objects.filter(material_pieces__scan_events__scanner=instance)
+        .values_list("production_batch_id", flat=True)
+        .distinct(),
+    )
+
+
+# Fields whose edits move existing scans to another line or batch
+ROLLUP_SOURCE_FIELDS = {
+    Scanner: ("type", "production_line_id"),
+    MaterialPiece: ("bundle_id",),
+}
+
+
+@receiver(post_init, sender=Scanner)
+@receiver(post_init, sender=MaterialPiece)
+@receiver(post_save, sender=Scanner)
+@receiver(post_save, sender=MaterialPiece)
+def track_rollup_source_fields(sender, instance, **kwargs):
+    """Remember the stored values of the fields rollups depend on"""
+    instance._rollup_source_values = {
+        field: instance.__dict__[field]
+        for field in ROLLUP_SOURCE_FIELDS[sender]
+        if field in instance.__dict__
+    }
+
+
+def rollup_source_changed(sender, instance):
+    """Whether a saved instance changes a field its scans are counted by"""
+    if instance._state.adding:
+        return False
+    stored = instance.__dict__.get("_rollup_source_values", {})
+    return any(
+        field in instance.__dict__
+        and (field not in stored or stored[field] != instance.__dict__[field])
+        for field in ROLLUP_SOURCE_FIELDS[sender]
+    )
+
+
+@receiver(pre_save, sender=Scanner)
+def rollup_scanner_pre_save(sender, instance, raw=False, **kwargs):
+    """Invalidate the batches a scanner has scanned when its type or line changes"""
+    if raw or not rollup_source_changed(sender, instance):
+        return
+    invalidate_rollups(
+        Bundle.objects.filter(material_pieces__scan_events__scanner=instance)
+        .values_list("production_batch_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(pre_save, sender=MaterialPiece)
+def rollup_material_piece_pre_save(sender, instance, raw=False, **kwargs):
+    """Invalidate both batches when a piece moves to a bundle of another batch"""
+    if raw or not rollup_source_changed(sender, instance):
+        return
+    old_bundle_id = instance._rollup_source_values.get("bundle_id")
+    production_batch_ids = set(
+        Bundle.objects.filter(pk__in=[old_bundle_id, instance.bundle_id]).values_list(
+            "production_batch_id", flat=True
+        )
+    )
+    if len(production_batch_ids) > 1 or old_bundle_id is None:
+        invalidate_rollups(production_batch_ids)
@@ -1,9 +1,50 @@
 from django.urls import path
-from tracker.views import scan_qr, scanner_scan, dashboard, scan_qr_data
+from tracker.views import (
+    scan_qr,
+    scanner_scan,
+    dashboard,
+    dashboard_stats_api,
+    bundle_print_sheet,
+    bundle_pieces_qr_codes,
+    production_batch_print_sheet,
+    qr_image,
+    scan_qr_data,
+    scan_qr_data_bulk,
+    scan_events_export,
+    scan_events_arrow_export,
+)
 
 urlpatterns = [
     path("scan/", scan_qr, name="scan_qr"),
     path("scan/<int:scanner_id>/", scanner_scan, name="scanner_scan"),
     path("scan_data/", scan_qr_data, name="scan_qr_data"),
+    path("scan_data/bulk/", scan_qr_data_bulk, name="scan_qr_data_bulk"),
+    path(
+        "api/batches/<int:batch_id>/stats/",
+        dashboard_stats_api,
+        name="dashboard_stats_api",
+    ),
+    path(
+        "print/bundles/<int:bundle_id>/",
+        bundle_print_sheet,
+        name="bundle_print_sheet",
+    ),
+    path(
+        "print/bundles/<int:bundle_id>/pieces/",
+        bundle_pieces_qr_codes,
+        name="bundle_pieces_qr_codes",
+    ),
+    path(
+        "print/batches/<int:batch_id>/",
+        production_batch_print_sheet,
+        name="production_batch_print_sheet",
+    ),
+    path("export/scan-events/", scan_events_export, name="scan_events_export"),
+    path(
+        "export/scan-events/arrow/",
+        scan_events_arrow_export,
+        name="scan_events_arrow_export",
+    ),
+    path("qr/<str:qr_code>.<str:image_format>", qr_image, name="qr_image"),
     path("", dashboard, name="dashboard"),
 ]
@@ -1,20 +1,33 @@
 import json
-from django.db.models import Count, Q, F, Min, OuterRef, Subquery
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render, get_object_or_404
-from tracker.models import (
-    MaterialPiece,
-    Scanner,
-    ScanEvent,
-    ProductionBatch,
-    ProductionLine,
-    QualityCheck,
-    Defect,
-    ReworkAssignment,
-    Bundle,
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+from tracker.models import Scanner, ProductionBatch, Bundle, Defect
+from tracker.services.dashboard import get_dashboard_stats
+from tracker.services.event_log import get_pyarrow, stream_event_log_ipc
+from tracker.services.exports import (
+    filter_scan_events,
+    parse_export_bound,
+    scan_events_csv_response,
 )
-from django.db import connection
+from tracker.services.labels import LABEL_CONTENT_TYPES
+from tracker.services.print_sheets import (
+    iter_bundle_labels,
+    iter_production_batch_labels,
+    stream_label_sheet_pdf,
+)
+from tracker.services.qr_images import (
+    get_label_context,
+    get_label_etag,
+    get_label_image,
+)
+from tracker.services.scanning import process_scan_batch, process_scan_data
+from tracker.utils import build_combined_qr_codes_html
 
 
 def scan_qr(request):
@@ -39,136 +52,31 @@ def scanner_scan(request, scanner_id):
 def scan_qr_data(request):
     if request.method == "POST":
         data = json.loads(request.body.decode("utf-8"))
-        qr_data = data.get("qr_data")
-        scanner_name = data.get("scanner_name")
+        result, status = process_scan_data(data)
+        return JsonResponse(result, status=status)
+
+    return JsonResponse({"error": "Invalid request"}, status=400)
 
-        # For QC scanners, we might get additional data
-        quality_status = data.get("quality_status")
-        defect_ids = data.get("defect_ids", [])
-        rework_notes = data.get("rework_notes")
 
+@csrf_exempt
+def scan_qr_data_bulk(request):
+    if request.method == "POST":
         try:
-            scanner = Scanner.objects.get(name=scanner_name)
-            production_line = scanner.production_line
-            if not production_line:
-                return JsonResponse(
-                    {"error": "Scanner is not assigned to a production line."},
-                    status=400,
-                )
-        except Scanner.DoesNotExist:
-            return JsonResponse({"error": "Scanner not found"}, status=400)
-
-        # First try to find a Material Piece with the scanned QR code
-        material_pieces = []
-        try:
-            material_piece = MaterialPiece.objects.get(qr_code=qr_data)
-            material_pieces = [material_piece]
-        except MaterialPiece.DoesNotExist:
-            # If not found, try to find a Bundle
-            try:
-                bundle = Bundle.objects.get(qr_code=qr_data)
-                # Get all material pieces from this bundle
-                material_pieces = list(bundle.material_pieces.all())
-                if not material_pieces:
-                    return JsonResponse(
-                        {"error": "Bundle found but it has no material pieces"},
-                        status=400,
-                    )
-            except Bundle.DoesNotExist:
-                return JsonResponse(
-                    {
-                        "error": "Invalid QR code - not matching any Material Piece or Bundle"
-                    },
-                    status=400,
-                )
-
-        # Process all material pieces
-        processed_count = 0
-        for material_piece in material_pieces:
-            # Check if a scan event already exists for this scanner and QR code
-            existing_scan = ScanEvent.objects.filter(
-                scanner=scanner, material_piece=material_piece
-            ).exists()
-
-            if existing_scan:
-                continue  # Skip this piece if already scanned
-
-            # Create the ScanEvent
-            scan_event = ScanEvent.objects.create(
-                scanner=scanner, material_piece=material_piece
-            )
-            processed_count += 1
-
-            # Handle different scanner types
-            if scanner.type == Scanner.ScannerType.IN:
-                # Update MaterialPiece location
-                material_piece.current_production_line = production_line
-                material_piece.production_flow.add(production_line)
-                material_piece.save()
-
-            elif scanner.type == Scanner.ScannerType.QC:
-                # Create quality check record
-                if not quality_status:
-                    return JsonResponse(
-                        {"error": "Quality status is required for QC scanners"},
-                        status=400,
-                    )
-
-                quality_check = QualityCheck.objects.create(
-                    scan_event=scan_event,
-                    status=quality_status,
-                    notes=data.get("notes", ""),
-                )
-
-                # Add defects if any
-                if defect_ids:
-                    defects = Defect.objects.filter(id__in=defect_ids)
-                    quality_check.defects.add(*defects)
-
-                # Create rework assignment if status is REWORK
-                if quality_status == QualityCheck.QualityStatus.REWORK and rework_notes:
-                    ReworkAssignment.objects.create(
-                        quality_check=quality_check,
-                        rework_production_line=production_line,
-                        rework_notes=rework_notes,
-                    )
-
-            # For OUT scanners, we don't need to do anything special other than create the scan event
-            # The material_piece.production_flow already keeps track of history
-
-        # Generate appropriate message based on scan result
-        if processed_count == 0:
+            data = json.loads(request.body.decode("utf-8"))
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON"}, status=400)
+        scans = data.get("scans") if isinstance(data, dict) else None
+        if not isinstance(scans, list):
+            return JsonResponse({"error": "A list of scans is required"}, status=400)
+        max_size = settings.SCAN_BULK_MAX_SIZE
+        if len(scans) > max_size:
             return JsonResponse(
-                {
-                    "message": "All pieces in this scan were already processed",
-                    "status": "success",
-                }
+                {"error": f"At most {max_size} scans can be sent at once"},
+                status=400,
             )
 
-        if len(material_pieces) > 1:
-            # Bundle scan
-            bundle_name = material_pieces[0].bundle.material.name
-            if scanner.type == Scanner.ScannerType.IN:
-                message = f"Bundle {bundle_name}: {processed_count} pieces scanned at {production_line.name}"
-            elif scanner.type == Scanner.ScannerType.QC:
-                message = f"Bundle {bundle_name}: {processed_count} pieces quality checked as {quality_status}"
-            else:  # OUT
-                message = f"Bundle {bundle_name}: {processed_count} pieces completed at {production_line.name}"
-        else:
-            # Single piece scan
-            piece_name = material_pieces[0].bundle.material.name
-            if scanner.type == Scanner.ScannerType.IN:
-                message = (
-                    f"Material Piece {piece_name} scanned at {production_line.name}"
-                )
-            elif scanner.type == Scanner.ScannerType.QC:
-                message = f"Quality Check completed for {piece_name} with status {quality_status}"
-            else:  # OUT
-                message = (
-                    f"Material Piece {piece_name} completed at {production_line.name}"
-                )
-
-        return JsonResponse({"message": message, "status": "success"})
+        results = process_scan_batch(scans)
+        return JsonResponse({"results": results, "status": "success"})
 
     return JsonResponse({"error": "Invalid request"}, status=400)
 
@@ -180,162 +88,10 @@ def dashboard(request):
 
     if batch_id:
         selected_batch = get_object_or_404(ProductionBatch, pk=batch_id)
-        # Get total pieces
-        total_pieces = MaterialPiece.objects.filter(
-            bundle__production_batch=selected_batch
-        ).count()
-
-        # Material breakdown
-        material_breakdown = (
-            MaterialPiece.objects.filter(bundle__production_batch=selected_batch)
-            .values("bundle__material__name")
-            .annotate(count=Count("id"))
-            .order_by("-count")
-        )
-
-        # Get production line stats
-        production_lines = ProductionLine.objects.all().order_by("id")
-        production_line_stats = []
-
-        # First, get all material pieces for this batch
-        batch_pieces = MaterialPiece.objects.filter(
-            bundle__production_batch=selected_batch
-        )
-
-        # For each production line
-        for line in production_lines:
-            # Get all scanners for this line
-            in_scanners = Scanner.objects.filter(
-                production_line=line, type=Scanner.ScannerType.IN
-            )
-            out_scanners = Scanner.objects.filter(
-                production_line=line, type=Scanner.ScannerType.OUT
-            )
-            qc_scanners = Scanner.objects.filter(
-                production_line=line, type=Scanner.ScannerType.QC
-            )
-
-            # Count pieces scanned at IN scanners for this line
-            input_pieces = (
-                ScanEvent.objects.filter(
-                    scanner__in=in_scanners,
-                    material_piece__in=batch_pieces,
-                )
-                .values("material_piece")
-                .distinct()
-                .count()
-            )
-
-            # Initialize output pieces count
-            output_pieces = 0
-
-            # Get all pieces that were scanned at this line's IN scanners
-            scanned_pieces_ids = (
-                ScanEvent.objects.filter(
-                    scanner__in=in_scanners,
-                    material_piece__in=batch_pieces,
-                )
-                .values_list("material_piece_id", flat=True)
-                .distinct()
-            )
-
-            # For each piece that was scanned at this line
-            for piece_id in scanned_pieces_ids:
-                piece_complete_at_this_line = False
-
-                # Check output priority:
-                # 1. First check if this piece was scanned at an OUT scanner in this line
-                if ScanEvent.objects.filter(
-                    scanner__in=out_scanners, material_piece_id=piece_id
-                ).exists():
-                    piece_complete_at_this_line = True
-
-                # 2. If not, check if this piece was scanned at a QC scanner in this line
-                elif ScanEvent.objects.filter(
-                    scanner__in=qc_scanners, material_piece_id=piece_id
-                ).exists():
-                    piece_complete_at_this_line = True
-
-                # 3. If not, check if this piece was scanned at any later line
-                else:
-                    # Get all production lines that have scanned this piece
-                    other_line_scans = (
-                        ScanEvent.objects.filter(material_piece_id=piece_id)
-                        .exclude(scanner__production_line=line)
-                        .values("scanner__production_line", "scan_time")
-                        .order_by("scan_time")
-                    )
-
-                    # Get the earliest scan time for this piece at this line
-                    this_line_scan_time = (
-                        ScanEvent.objects.filter(
-                            scanner__production_line=line, material_piece_id=piece_id
-                        )
-                        .order_by("scan_time")
-                        .values_list("scan_time", flat=True)
-                        .first()
-                    )
-
-                    if this_line_scan_time:
-                        # Check if any other line scanned this piece after this line
-                        for scan in other_line_scans:
-                            if scan["scan_time"] > this_line_scan_time:
-                                piece_complete_at_this_line = True
-                                break
-
-                # If the piece is complete at this line by any of the criteria, count it as output
-                if piece_complete_at_this_line:
-                    output_pieces += 1
-
-            # Get QC statistics
-            qc_scans = ScanEvent.objects.filter(
-                scanner__in=qc_scanners,
-                material_piece__in=batch_pieces,
-            ).prefetch_related("quality_check")
-
-            # Count by QC status
-            accepted_count = 0
-            rejected_count = 0
-            rework_count = 0
-
-            for scan in qc_scans:
-                if hasattr(scan, "quality_check"):
-                    if scan.quality_check.status == QualityCheck.QualityStatus.ACCEPTED:
-                        accepted_count += 1
-                    elif (
-                        scan.quality_check.status == QualityCheck.QualityStatus.REJECTED
-                    ):
-                        rejected_count += 1
-                    elif scan.quality_check.status == QualityCheck.QualityStatus.REWORK:
-                        rework_count += 1
-
-            # Calculate shortage/liability
-            shortage_liability = input_pieces - output_pieces
-
-            # Calculate efficiency more accurately by accounting for quality issues
-            efficiency = 0
-            if input_pieces > 0:
-                # Calculate effective output by applying penalties for rejected and rework pieces
-                # Rejected pieces contribute 0% to efficiency (complete loss)
-                # Rework pieces contribute 50% to efficiency (partial completion)
-                effective_output = accepted_count + (rework_count * 0.5)
-                efficiency = (effective_output / input_pieces) * 100
-
-            # Calculate shortage/liability
-            shortage_liability = input_pieces - output_pieces
-
-            production_line_stats.append(
-                {
-                    "line": line,
-                    "input_pieces": input_pieces,
-                    "output_pieces": output_pieces,
-                    "shortage_liability": shortage_liability,
-                    "efficiency": efficiency,
-                    "accepted_count": accepted_count,
-                    "rejected_count": rejected_count,
-                    "rework_count": rework_count,
-                }
-            )
+        stats = get_dashboard_stats(selected_batch)
+        total_pieces = stats["total_pieces"]
+        production_line_stats = stats["production_line_stats"]
+        material_breakdown = stats["material_breakdown"]
     else:
         total_pieces = 0
         production_line_stats = []
@@ -349,3 +105,131 @@ def dashboard(request):
         "material_breakdown": material_breakdown,
     }
     return render(request, "tracker/dashboard.html", context)
+
+
+def dashboard_stats_api(request, batch_id):
+    production_batch = get_object_or_404(ProductionBatch, pk=batch_id)
+    stats = get_dashboard_stats(production_batch)
+    production_line_stats = [
+        {
+            **{key: value for key, value in stat.items() if key != "line"},
+            "line_id": stat["line"].id,
+            "line_name": stat["line"].name,
+        }
+        for stat in stats["production_line_stats"]
+    ]
+    return JsonResponse(
+        {
+            "batch_id": production_batch.id,
+            "batch_number": production_batch.batch_number,
+            "total_pieces": stats["total_pieces"],
+            "material_breakdown": [
+                {"material": item["bundle__material__name"], "count": item["count"]}
+                for item in stats["material_breakdown"]
+            ],
+            "production_line_stats": production_line_stats,
+        }
+    )
+
+
+def _get_scan_event_export_queryset(request):
+    """Returns the filtered scan events, or an error response for bad filters"""
+    batch_id = request.GET.get("batch_id")
+    line_id = request.GET.get("line_id")
+    after_id = request.GET.get("after_id")
+    if not all(value.isdigit() for value in (batch_id, line_id, after_id) if value):
+        return None, JsonResponse(
+            {"error": "Invalid batch, line or event id"}, status=400
+        )
+    try:
+        start = parse_export_bound(request.GET.get("start"))
+        end = parse_export_bound(request.GET.get("end"), end=True)
+    except ValueError as e:
+        return None, JsonResponse({"error": str(e)}, status=400)
+
+    queryset = filter_scan_events(
+        batch_id=batch_id, line_id=line_id, start=start, end=end
+    )
+    if after_id:
+        queryset = queryset.filter(id__gt=after_id)
+    return queryset, None
+
+
+@staff_member_required
+@require_safe
+def scan_events_export(request):
+    queryset, error = _get_scan_event_export_queryset(request)
+    if error:
+        return error
+    excel = request.GET.get("format") == "excel"
+    return scan_events_csv_response(queryset, excel=excel)
+
+
+@staff_member_required
+@require_safe
+def scan_events_arrow_export(request):
+    try:
+        get_pyarrow()
+    except ImproperlyConfigured as e:
+        return JsonResponse({"error": str(e)}, status=501)
+    queryset, error = _get_scan_event_export_queryset(request)
+    if error:
+        return error
+
+    response = StreamingHttpResponse(
+        stream_event_log_ipc(queryset),
+        content_type="application/vnd.apache.arrow.stream",
+    )
+    response["Content-Disposition"] = 'attachment; filename="scan-events.arrows"'
+    return response
+
+
+def _label_sheet_response(labels, filename):
+    response = StreamingHttpResponse(
+        stream_label_sheet_pdf(labels), content_type="application/pdf"
+    )
+    response["Content-Disposition"] = f'inline; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def bundle_print_sheet(request, bundle_id):
+    bundle = get_object_or_404(Bundle, pk=bundle_id)
+    labels = iter_bundle_labels(Bundle.objects.filter(pk=bundle.pk))
+    return _label_sheet_response(labels, f"bundle-{bundle.pk}-labels.pdf")
+
+
+@staff_member_required
+def bundle_pieces_qr_codes(request, bundle_id):
+    bundle = get_object_or_404(Bundle, pk=bundle_id)
+    pieces = bundle.material_pieces.only("id", "qr_code", "qr_image").order_by("id")
+    return HttpResponse(build_combined_qr_codes_html(pieces))
+
+
+@staff_member_required
+def production_batch_print_sheet(request, batch_id):
+    production_batch = get_object_or_404(ProductionBatch, pk=batch_id)
+    labels = iter_production_batch_labels(production_batch)
+    return _label_sheet_response(
+        labels, f"batch-{production_batch.batch_number}-labels.pdf"
+    )
+
+
+@require_safe
+def qr_image(request, qr_code, image_format):
+    if image_format not in LABEL_CONTENT_TYPES:
+        raise Http404("Unsupported image format")
+    context = get_label_context(qr_code)
+    if context is None:
+        raise Http404("Unknown QR code")
+
+    etag = f'"{get_label_etag(qr_code, context, image_format)}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            get_label_image(qr_code, context, image_format),
+            content_type=LABEL_CONTENT_TYPES[image_format],
+        )
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.QR_IMAGE_MAX_AGE)
+    return response
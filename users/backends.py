@@ -1,6 +1,6 @@
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
 from users.models import User
+from users.services.auth import find_user_by_login, get_cached_user
 
 
 # --- AUTHENTICATION BACKENDS ---
@@ -11,9 +11,7 @@ class EmailOrUsernameModelBackend(ModelBackend):
         if not username or not password:
             return None
         try:
-            user = User.objects.get(
-                Q(username__iexact=username) | Q(email__iexact=username)
-            )
+            user = find_user_by_login(username)
         except User.DoesNotExist:
             return None
         if user.check_password(password):
@@ -21,7 +19,4 @@ class EmailOrUsernameModelBackend(ModelBackend):
         return None
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return get_cached_user(user_id)
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:06
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0002_user_lower_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+    ]
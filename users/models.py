@@ -1,5 +1,13 @@
 from django.contrib.auth.models import AbstractUser, Permission
+from django.contrib.auth.models import UserManager as AuthUserManager
 from django.db import models
+from django.db.models.functions import Lower
+from users.services.auth import invalidate_cached_users
+from users.services.permissions import (
+    get_effective_permissions,
+    invalidate_user_permissions,
+)
+from common.services.cache import is_cache_shared
 
 
 class Department(models.Model):
@@ -20,6 +28,25 @@ class Role(models.Model):
         return self.name
 
 
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Updates the users and drops them from the shared caches, which the
+        post_save signal does not do for queryset updates.
+        """
+        user_ids = list(self.values_list("pk", flat=True)) if is_cache_shared() else []
+        rows = super().update(**kwargs)
+        invalidate_user_permissions(user_ids)
+        invalidate_cached_users(user_ids)
+        return rows
+
+    update.alters_data = True
+
+
+class UserManager(AuthUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     department = models.ForeignKey(
         Department,
@@ -33,30 +60,37 @@ class User(AbstractUser):
         Permission, blank=True, related_name="custom_users"
     )
 
+    objects = UserManager()
+
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            models.Index(Lower("username"), name="user_username_lower_idx"),
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
+    def get_effective_permissions(self):
+        """Cached (codenames, permissions) granted to the user, see has_perm"""
+        return get_effective_permissions(self)
 
     def has_perm(self, perm, obj=None):
         # Merge perms from department, roles, and user_permissions
         if self.is_superuser:
             return True
 
-        # Check user-level
-        if self.user_permissions.filter(codename=perm.split(".")[-1]).exists():
+        # Check user, role and department level codenames
+        codenames, permissions = self.get_effective_permissions()
+        if perm.split(".")[-1] in codenames:
             return True
 
-        # Check role-level
-        if self.roles.filter(permissions__codename=perm.split(".")[-1]).exists():
-            return True
+        # Model level permissions from the auth backends
+        if obj is None:
+            return perm in permissions
+        return super().has_perm(perm, obj)
 
-        # Check department-level
-        if (
-            self.department
-            and self.department.permissions.filter(
-                codename=perm.split(".")[-1]
-            ).exists()
-        ):
+    def has_module_perms(self, app_label):
+        if self.is_active and self.is_superuser:
             return True
-
-        return super().has_perm(perm, obj)
+        _, permissions = self.get_effective_permissions()
+        return any(perm.startswith(f"{app_label}.") for perm in permissions)
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower
+from common.services.cache import is_cache_shared
+
+
+# --- AUTHENTICATION LOOKUPS ---
+
+
+def find_user_by_login(login):
+    """
+    Finds the user whose username or email matches a login, ignoring case.
+
+    Both sides are compared as lower(), so the query can use the functional
+    indexes on lower(username) and lower(email).
+    """
+    login = login.lower()
+    return (
+        get_user_model()
+        .objects.alias(username_lower=Lower("username"), email_lower=Lower("email"))
+        .get(Q(username_lower=login) | Q(email_lower=login))
+    )
+
+
+# --- USER CACHE ---
+
+
+def get_user_cache_key(user_id):
+    return f"users:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """
+    Returns a user by id from a short-lived cache, loading it on a miss.
+    Returns None if the user does not exist.
+
+    Users are only cached when the cache is shared by every process, so an
+    invalidation reaches all of them.
+    """
+    User = get_user_model()
+    if not is_cache_shared():
+        return User.objects.filter(pk=user_id).first()
+
+    key = get_user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_users(user_ids):
+    if is_cache_shared():
+        cache.delete_many([get_user_cache_key(user_id) for user_id in user_ids])
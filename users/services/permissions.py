@@ -0,0 +1,81 @@
+import time
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db.models import Q
+from common.services.cache import is_cache_shared
+
+
+# --- EFFECTIVE PERMISSION CACHE ---
+
+VERSION_CACHE_KEY = "users:permissions:version"
+
+
+def get_cache_version():
+    """
+    Version shared by all cached permission sets. Bumping it invalidates every
+    user at once, e.g. when a role's permissions change.
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        # A time based version never repeats one that was evicted
+        version = time.time_ns()
+        if not cache.add(VERSION_CACHE_KEY, version, timeout=None):
+            version = cache.get(VERSION_CACHE_KEY, version)
+    return version
+
+
+def get_cache_key(user_id):
+    return f"users:permissions:{get_cache_version()}:{user_id}"
+
+
+def compute_effective_permissions(user):
+    """
+    Returns (codenames, permissions) for a user:
+    - codenames granted directly, through roles or through the department
+    - "app_label.codename" permissions granted by the auth backends
+    """
+    granted = Q(custom_users=user) | Q(roles__user=user)
+    if user.department_id:
+        granted |= Q(departments=user.department_id)
+    codenames = frozenset(
+        Permission.objects.filter(granted)
+        .order_by()
+        .values_list("codename", flat=True)
+        .distinct()
+    )
+    permissions = frozenset(user.get_all_permissions())
+    return codenames, permissions
+
+
+def get_effective_permissions(user):
+    """
+    Returns the effective permissions of a user, computed once and kept on the
+    instance for the request, and in the cache for other requests when the
+    cache is shared by every process.
+    """
+    if "_effective_permissions" in user.__dict__:
+        return user._effective_permissions
+
+    if is_cache_shared():
+        key = get_cache_key(user.pk)
+        effective = cache.get(key)
+        if effective is None:
+            effective = compute_effective_permissions(user)
+            cache.set(key, effective, settings.USER_PERMISSIONS_CACHE_TIMEOUT)
+    else:
+        effective = compute_effective_permissions(user)
+    user._effective_permissions = effective
+    return effective
+
+
+def invalidate_user_permissions(user_ids):
+    """Drops the cached permissions of some users"""
+    if is_cache_shared():
+        cache.delete_many([get_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all_permissions():
+    """Drops the cached permissions of every user"""
+    if is_cache_shared():
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
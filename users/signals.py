@@ -0,0 +1,62 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from users.models import Department, Role, User
+from users.services.auth import invalidate_cached_users
+from users.services.permissions import (
+    invalidate_all_permissions,
+    invalidate_user_permissions,
+)
+
+
+# --- PERMISSION CACHE INVALIDATION SIGNALS ---
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate the users whose roles, groups or permissions changed"""
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        instance.__dict__.pop("_effective_permissions", None)
+        invalidate_user_permissions([instance.pk])
+    elif pk_set:
+        # Changed from the role, group or permission side
+        invalidate_user_permissions(pk_set)
+    else:
+        # Cleared from the other side, the affected users are not known
+        invalidate_all_permissions()
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+@receiver(m2m_changed, sender=Department.permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def shared_permissions_changed(sender, action, **kwargs):
+    """Invalidate every user when the permissions of a role, department or group change"""
+    if action.startswith("post_"):
+        invalidate_all_permissions()
+
+
+@receiver(post_save, sender=User)
+def user_post_save(sender, instance, created, **kwargs):
+    """Invalidate a user whose department or status may have changed"""
+    if not created:
+        instance.__dict__.pop("_effective_permissions", None)
+        invalidate_user_permissions([instance.pk])
+        invalidate_cached_users([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    """Stop serving a deleted user from the cache"""
+    invalidate_cached_users([instance.pk])
+
+
+@receiver(post_delete, sender=Role)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Group)
+def permission_holder_post_delete(sender, **kwargs):
+    """Invalidate every user when a role, department or group is deleted"""
+    invalidate_all_permissions()